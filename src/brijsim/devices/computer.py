@@ -10,3 +10,4 @@ class JumpComputer(Device):
 
     def process(self, dt: float):
         self.state = str(self.flow_ports["pwr"].at_p_capacity())
+        self.sleep()
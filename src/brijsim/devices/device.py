@@ -19,10 +19,22 @@ class Device(Body3D):
     def panel(self):
         return Panel(self.uuid, name=self.name, widgets=[])
 
+    # A sleeping device is woken by an action or a change to one of its ports
+    def sleep(self):
+        super().sleep()
+        for port in self.flow_ports.values():
+            port.watch(self.wake)
+
+    def wake(self):
+        super().wake()
+        for port in self.flow_ports.values():
+            port.unwatch(self.wake)
+
     @staticmethod
     def action(func):
         @wraps(func)
         def wrapper(self, *args, **kwargs):
+            self.wake()
             return func(self, *args, **kwargs)
 
         wrapper._is_action = True
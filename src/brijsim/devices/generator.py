@@ -33,6 +33,9 @@ class FusionGenerator(Device):
                     self.flow_ports["boost"].rate_capacity = 0
                     self.flow_ports["src"].rate_capacity = 100.0
 
+        # Everything this waits on is an action or a port change
+        self.sleep()
+
     @property
     def panel(self):
         return Panel(
@@ -120,3 +123,7 @@ class AuxGenerator(Device):
         self.flow_ports["src"].rate_capacity = (
             self.level * self.rate_capacity * self.flow_ports["fuel"].rate_fraction
         )
+
+        # Only ramping needs every tick, otherwise follow the fuel port
+        if self.state in (SimpleGeneratorState.OFF, SimpleGeneratorState.RUNNING):
+            self.sleep()
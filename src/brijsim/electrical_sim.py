@@ -1,7 +1,16 @@
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from concurrent.futures import Executor
 from dataclasses import dataclass, field
+from enum import StrEnum, auto
+from itertools import pairwise
+from math import exp, isclose, log, sqrt
 from typing import Self
 
 import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import SuperLU, splu
 
 
 @dataclass
@@ -47,93 +56,684 @@ class Node:
         ]
 
 
+class NetworkNode(Node):
+    # A node of an ElectricalNetwork, viewing its voltage and links there
+    def __init__(self, nodes: "NodeList", id: int):
+        self.id = id
+        self._nodes = nodes
+
+    @property
+    def voltage(self) -> float:
+        return float(self._nodes.voltages[self.id])
+
+    @voltage.setter
+    def voltage(self, value: float):
+        self._nodes.voltages[self.id] = value
+
+    @property
+    def links(self) -> list[Link]:
+        return self._nodes.links(self.id)
+
+
+class NodeList(Sequence[Node]):
+    # The nodes of a network, with their voltages in one array. Node objects
+    # are only made when indexed, and links only gathered when first asked
+    # for, so adding a large netlist doesn't create either per node.
+    def __init__(self):
+        self.voltages = np.zeros(1)
+        self._nodes: dict[int, NetworkNode] = {}
+        self._pending: list[tuple[Sequence[Component], np.ndarray, np.ndarray]] = []
+        self._links: dict[int, list[Link]] = {}
+
+    def __len__(self) -> int:
+        return len(self.voltages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+
+        node = self._nodes.get(index)
+        if node is None:
+            node = self._nodes[index] = NetworkNode(self, index)
+        return node
+
+    def grow(self, count: int):
+        if count > len(self.voltages):
+            self.voltages = np.concat([self.voltages, np.zeros(count - len(self))])
+
+    def link(self, components: Sequence[Component], p: np.ndarray, n: np.ndarray):
+        self._pending.append((components, p, n))
+
+    def links(self, id: int) -> list[Link]:
+        for components, p, n in self._pending:
+            for component, pk, nk in zip(components, p.tolist(), n.tolist()):
+                self._links.setdefault(pk, []).append(Link(component, "p"))
+                self._links.setdefault(nk, []).append(Link(component, "n"))
+        self._pending = []
+
+        return self._links.setdefault(id, [])
+
+
 @dataclass
 class IndVoltageSource(Component):
     voltage: float = 0.0
     current: float = 0.0
+    # Small-signal amplitude and phase in degrees, for AC analysis
+    ac_magnitude: float = 0.0
+    ac_phase: float = 0.0
 
 
 @dataclass
 class IndCurrentSource(Component):
     voltage: float = 0.0
     current: float = 0.0
+    # Small-signal amplitude and phase in degrees, for AC analysis
+    ac_magnitude: float = 0.0
+    ac_phase: float = 0.0
+
+
+@dataclass
+class Capacitor(Component):
+    capacitance: float
+    voltage: float = 0.0
+    current: float = 0.0
+
+
+@dataclass
+class Inductor(Component):
+    inductance: float
+    voltage: float = 0.0
+    current: float = 0.0
+
+
+@dataclass
+class Switch(Component):
+    # A breaker or variable resistor. Changing it is applied as a low-rank
+    # update to the factored network instead of refactoring.
+    resistance: float
+    closed: bool = True
+
+    @property
+    def conductance(self) -> float:
+        return 1 / self.resistance if self.closed else 0.0
+
+
+class NonlinearComponent(Component, ABC):
+    # A two-terminal component solved by Newton-Raphson iteration
+
+    @abstractmethod
+    def evaluate(self, voltage: float) -> tuple[float, float]:
+        # Current from p to n through the component for a voltage across it,
+        # and the derivative of that current with respect to the voltage
+        ...
+
+    def limit(self, voltage: float, previous: float) -> float:
+        # Limit the voltage reached by a Newton step
+        return voltage
+
+    def update(self, voltage: float):
+        self.current, _ = self.evaluate(voltage)
+
+
+@dataclass
+class Diode(NonlinearComponent):
+    saturation_current: float = 1e-14
+    thermal_voltage: float = 0.025852
+    voltage: float = 0.0
+    current: float = 0.0
+
+    @property
+    def critical_voltage(self) -> float:
+        vt = self.thermal_voltage
+        return vt * log(vt / (sqrt(2) * self.saturation_current))
+
+    def evaluate(self, voltage: float) -> tuple[float, float]:
+        # Shockley diode equation
+        e = exp(voltage / self.thermal_voltage)
+        current = self.saturation_current * (e - 1)
+        return current, self.saturation_current * e / self.thermal_voltage
+
+    def limit(self, voltage: float, previous: float) -> float:
+        # SPICE's pnjlim: past the knee, a step is compressed logarithmically
+        # so the exponential can't run away.
+        vt = self.thermal_voltage
+        if voltage <= self.critical_voltage or abs(voltage - previous) <= 2 * vt:
+            return voltage
+
+        if previous > 0:
+            arg = 1 + (voltage - previous) / vt
+            return previous + vt * log(arg) if arg > 0 else self.critical_voltage
+
+        return vt * log(voltage / vt)
+
+    def update(self, voltage: float):
+        self.voltage = voltage
+        self.current, _ = self.evaluate(voltage)
+
+
+@dataclass
+class ConstantPowerLoad(NonlinearComponent):
+    # Draws a fixed power, like a regulated converter. Below min_voltage it
+    # acts as a resistor so the current stays finite at 0 V.
+    power: float
+    min_voltage: float = 1.0
+    voltage: float = 0.0
+    current: float = 0.0
+
+    def evaluate(self, voltage: float) -> tuple[float, float]:
+        if abs(voltage) < self.min_voltage:
+            conductance = self.power / self.min_voltage**2
+            return conductance * voltage, conductance
+
+        return self.power / voltage, -self.power / voltage**2
+
+    def update(self, voltage: float):
+        self.voltage = voltage
+        self.current, _ = self.evaluate(voltage)
+
+
+@dataclass
+class CurrentLimitedSource(NonlinearComponent):
+    # A voltage source behind an internal resistance whose output current is
+    # capped at current_limit. Like IndVoltageSource, current is negative when
+    # the source delivers power.
+    voltage: float
+    resistance: float
+    current_limit: float
+    current: float = 0.0
+
+    def evaluate(self, voltage: float) -> tuple[float, float]:
+        current = (voltage - self.voltage) / self.resistance
+        if abs(current) > self.current_limit:
+            return self.current_limit if current > 0 else -self.current_limit, 0.0
+
+        return current, 1 / self.resistance
+
+    def limit(self, voltage: float, previous: float) -> float:
+        # The current is piecewise linear, so stop a step at the edge of the
+        # region it started in to keep Newton from cycling between regions.
+        knee = self.current_limit * self.resistance
+        for edge in (self.voltage - knee, self.voltage + knee):
+            if not isclose(previous, edge) and (previous - edge) * (voltage - edge) < 0:
+                return edge
+
+        return voltage
+
+
+@dataclass
+class AcSweep:
+    # Phasor solutions of an AC analysis, one row per frequency. Node voltages
+    # include ground in column 0, so they can be indexed by node id.
+    frequencies: np.ndarray
+    voltages: np.ndarray
+    currents: np.ndarray
+
+    @property
+    def magnitude(self) -> np.ndarray:
+        return np.abs(self.voltages)
+
+    @property
+    def phase(self) -> np.ndarray:
+        # Degrees
+        return np.angle(self.voltages, deg=True)
+
+
+class ConvergenceError(RuntimeError):
+    pass
+
+
+class Integration(StrEnum):
+    BACKWARD_EULER = auto()
+    TRAPEZOIDAL = auto()
+
+
+@dataclass
+class StampList[T: Component]:
+    # Components of one kind, with the matrix index of each terminal recorded
+    # when the component is added. Ground (node 0) has index -1.
+    components: list[T] = field(default_factory=list)
+    p: list[int] = field(default_factory=list)
+    n: list[int] = field(default_factory=list)
+    _terminals: tuple | None = field(default=None, repr=False)
+
+    def add(self, component: T, np: int, nn: int):
+        self.extend([component], [np], [nn])
+
+    def extend(self, components: list[T], np_: Sequence[int], nn: Sequence[int]):
+        self.components.extend(components)
+        self.p.extend((np.asarray(np_, dtype=np.intp) - 1).tolist())
+        self.n.extend((np.asarray(nn, dtype=np.intp) - 1).tolist())
+        self._terminals = None
+
+    def __len__(self) -> int:
+        return len(self.components)
+
+    def terminals(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._terminals is None:
+            self._terminals = (
+                np.array(self.p, dtype=np.intp),
+                np.array(self.n, dtype=np.intp),
+            )
+
+        return self._terminals
+
+    def values(self, attr: str) -> np.ndarray:
+        return np.array([getattr(c, attr) for c in self.components], dtype=float)
+
+
+def stamp_conductances(
+    p: np.ndarray, n: np.ndarray, g: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # A conductance adds g on the diagonal of both terminals and -g between
+    # them. Entries for the ground node are dropped. Duplicates are summed when
+    # the COO triplets are converted, so parallel components just work.
+    rows = np.concatenate([p, n, p, n])
+    cols = np.concatenate([p, n, n, p])
+    vals = np.concatenate([g, g, -g, -g])
+    keep = (rows >= 0) & (cols >= 0)
+    return rows[keep], cols[keep], vals[keep]
+
+
+def stamp_incidence(
+    p: np.ndarray, n: np.ndarray, offset: int = 0
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Column k has +1 at the positive terminal and -1 at the negative terminal
+    # of branch k, i.e. the B matrix of MNA.
+    k = np.arange(len(p), dtype=np.intp) + offset
+    rows = np.concatenate([p, n])
+    cols = np.concatenate([k, k])
+    vals = np.concatenate([np.ones(len(p)), -np.ones(len(n))])
+    keep = rows >= 0
+    return rows[keep], cols[keep], vals[keep]
+
+
+def find_islands(A: sparse.csc_array) -> list[np.ndarray]:
+    # Sets of rows in A that only couple to each other
+    num_islands, labels = connected_components(A, directed=False)
+    order = np.argsort(labels, kind="stable")
+    bounds = np.searchsorted(labels[order], np.arange(num_islands + 1))
+    return [order[start:end] for start, end in pairwise(bounds)]
+
+
+class IslandLU:
+    # LU factors of A split into islands: sets of rows that only couple to
+    # each other (and ground), so each is an independent, smaller system.
+    # Islands are factored and solved on the executor if one is given. It
+    # must be a thread pool, as SuperLU objects can't be sent to a process.
+    def __init__(
+        self,
+        A: sparse.csc_array,
+        executor: Executor | None = None,
+        islands: list[np.ndarray] | None = None,
+    ):
+        if islands is None:
+            A = A.copy()
+            A.eliminate_zeros()
+            islands = find_islands(A)
+
+        self.islands = islands
+        self.executor = executor
+
+        blocks = [A[island][:, island] for island in self.islands]
+        self.lus: list[SuperLU] = list(self._map(splu, blocks))
+
+    def _map(self, func, *iterables):
+        if self.executor is None:
+            return map(func, *iterables)
+
+        return self.executor.map(func, *iterables)
+
+    def solve(self, z: np.ndarray) -> np.ndarray:
+        x = np.empty(z.shape)
+
+        def solve_island(island: np.ndarray, lu: SuperLU):
+            x[island] = lu.solve(np.ascontiguousarray(z[island]))
+
+        for _ in self._map(solve_island, self.islands, self.lus):
+            pass
+
+        return x
+
+
+class Factorization:
+    # LU factors of A, plus a Woodbury correction for switches whose
+    # conductance changed since A was factored:
+    #   (A + U D U^T)^-1 z = x - W (I + D U^T W)^-1 D U^T x
+    # where x = A^-1 z, W = A^-1 U and D holds the conductance changes.
+    def __init__(self, lu: IslandLU):
+        self.lu = lu
+        self.U: np.ndarray | None = None
+        self.W: np.ndarray | None = None
+        self.delta: np.ndarray | None = None
+        self.capacitance: np.ndarray | None = None
+
+    def update(self, U: np.ndarray, W: np.ndarray, delta: np.ndarray):
+        if len(delta) == 0:
+            self.U = self.W = self.delta = self.capacitance = None
+            return
+
+        self.U = U
+        self.W = W
+        self.delta = delta
+        self.capacitance = np.eye(len(delta)) + delta[:, None] * (U.T @ W)
+
+    def solve(self, z: np.ndarray) -> np.ndarray:
+        x = self.lu.solve(z)
+
+        if self.delta is None:
+            return x
+
+        x2 = x.reshape(len(x), -1)
+        y = np.linalg.solve(self.capacitance, self.delta[:, None] * (self.U.T @ x2))
+        return (x2 - self.W @ y).reshape(x.shape)
+
+
+def inject_currents(
+    size: int, p: np.ndarray, n: np.ndarray, current: np.ndarray
+) -> np.ndarray:
+    # Currents driven from n to p through an element flow into p and out of n
+    into_p = np.bincount(p[p >= 0], weights=current[p >= 0], minlength=size)
+    into_n = np.bincount(n[n >= 0], weights=current[n >= 0], minlength=size)
+    return into_p - into_n
 
 
 class ElectricalNetwork:
     def __init__(self):
-        self.nodes: list[Node] = [Node(0)]
+        self.nodes = NodeList()
         self.ind_voltage_sources: list[IndVoltageSource] = []
         self.ind_current_sources: list[IndCurrentSource] = []
         self.resistors: dict[str, Resistor] = {}
+        self.capacitors: dict[str, Capacitor] = {}
+        self.inductors: dict[str, Inductor] = {}
+        self.switches: dict[str, Switch] = {}
+        self.diodes: dict[str, Diode] = {}
+        self.constant_power_loads: dict[str, ConstantPowerLoad] = {}
+        self.current_limited_sources: dict[str, CurrentLimitedSource] = {}
+
+        self._resistor_stamps = StampList[Resistor]()
+        self._switch_stamps = StampList[Switch]()
+        self._capacitor_stamps = StampList[Capacitor]()
+        self._voltage_source_stamps = StampList[IndVoltageSource]()
+        self._inductor_stamps = StampList[Inductor]()
+        self._current_source_stamps = StampList[IndCurrentSource]()
+        self._nonlinear_stamps = StampList[NonlinearComponent]()
+
+        # Factorization of A, kept until the topology or a value in A changes,
+        # so new source values only need a back-substitution. Switch changes
+        # are layered on top as low-rank updates, up to a limit.
+        self._lu: Factorization | None = None
+        self._lu_values: np.ndarray | None = None
+        self._lu_switch_conductances: np.ndarray | None = None
+        self._lu_switch_delta: np.ndarray | None = None
+        self._switch_columns: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        self.max_low_rank_updates = 16
+        self.executor: Executor | None = None
+        self.factorization_count = 0
+
+        # With nonlinear components, the Jacobian is factored and reused
+        # across Newton iterations and run() calls for as long as it keeps
+        # converging quickly.
+        self._A: sparse.csc_array | None = None
+        self._A_values: np.ndarray | None = None
+        self._jacobian: IslandLU | None = None
+        self._jacobian_pattern: sparse.csc_array | None = None
+        self._jacobian_positions: np.ndarray | None = None
+        self._jacobian_islands: list[np.ndarray] | None = None
+        self.newton_tolerance = 1e-9
+        self.newton_contraction = 0.1
+        self.max_newton_iterations = 100
+        self.newton_iterations = 0
+        # Voltage each nonlinear component was at when Newton last converged
+        self._converged_voltages = np.zeros(0)
 
     def add_ind_voltage_source(self, name: str, np: int, nn: int, voltage: float):
-        source = IndVoltageSource(name=name, voltage=voltage)
-        self.get_node(np).link(source, "p")
-        self.get_node(nn).link(source, "n")
-        self.ind_voltage_sources.append(source)
+        self.add(IndVoltageSource(name=name, voltage=voltage), np, nn)
 
     def add_ind_current_source(self, name: str, np: int, nn: int, current: float):
-        source = IndCurrentSource(name=name, current=current)
-        self.get_node(np).link(source, "p")
-        self.get_node(nn).link(source, "n")
-        self.ind_current_sources.append(source)
+        self.add(IndCurrentSource(name=name, current=current), np, nn)
 
     def add_resistor(self, name: str, np: int, nn: int, resistance: float):
-        resistor = Resistor(name, resistance)
-        self.get_node(np).link(resistor, "p")
-        self.get_node(nn).link(resistor, "n")
-        self.resistors[name] = resistor
+        self.add(Resistor(name, resistance), np, nn)
+
+    def add_switch(
+        self, name: str, np: int, nn: int, resistance: float, closed: bool = True
+    ):
+        self.add(Switch(name, resistance, closed), np, nn)
+
+    def add_capacitor(self, name: str, np: int, nn: int, capacitance: float):
+        self.add(Capacitor(name, capacitance), np, nn)
+
+    def add_inductor(self, name: str, np: int, nn: int, inductance: float):
+        # Inductors get a branch current in the solution, like voltage sources,
+        # so that they can be a short circuit at DC.
+        self.add(Inductor(name, inductance), np, nn)
+
+    def add_diode(
+        self,
+        name: str,
+        np: int,
+        nn: int,
+        saturation_current: float = 1e-14,
+        thermal_voltage: float = 0.025852,
+    ):
+        self.add(Diode(name, saturation_current, thermal_voltage), np, nn)
+
+    def add_constant_power_load(
+        self, name: str, np: int, nn: int, power: float, min_voltage: float = 1.0
+    ):
+        self.add(ConstantPowerLoad(name, power, min_voltage), np, nn)
+
+    def add_current_limited_source(
+        self,
+        name: str,
+        np: int,
+        nn: int,
+        voltage: float,
+        resistance: float,
+        current_limit: float,
+    ):
+        self.add(CurrentLimitedSource(name, voltage, resistance, current_limit), np, nn)
+
+    def add(self, component: Component, np: int, nn: int):
+        self.add_components([component], [np], [nn])
+
+    def add_components(
+        self, components: Sequence[Component], np_: Sequence[int], nn: Sequence[int]
+    ):
+        # Add many components at once, e.g. from a netlist. The node list is
+        # grown once up front and the cached factorization dropped once.
+        # Components are grouped by type with array operations, and node links
+        # are only built if something asks for them.
+        p = np.asarray(np_, dtype=np.intp)
+        n = np.asarray(nn, dtype=np.intp)
+        self.get_node(int(max(p.max(initial=0), n.max(initial=0))))
+        self.nodes.link(components, p, n)
+
+        kinds: dict[type, int] = {}
+        codes = np.array(
+            [kinds.setdefault(type(c), len(kinds)) for c in components], dtype=np.intp
+        )
+
+        for code in range(len(kinds)):
+            index = np.flatnonzero(codes == code)
+            group = [components[i] for i in index.tolist()]
+            stamps, registry = self._registry(group[0])
+            stamps.extend(group, p[index], n[index])
+
+            if isinstance(registry, list):
+                registry.extend(group)
+            else:
+                registry.update((c.name, c) for c in group)
+
+        self.invalidate()
+
+    def _registry(self, component: Component) -> tuple[StampList, list | dict]:
+        # Where a component is stamped, and where it can be looked up
+        match component:
+            case IndVoltageSource():
+                return self._voltage_source_stamps, self.ind_voltage_sources
+            case IndCurrentSource():
+                return self._current_source_stamps, self.ind_current_sources
+            case Resistor():
+                return self._resistor_stamps, self.resistors
+            case Switch():
+                return self._switch_stamps, self.switches
+            case Capacitor():
+                return self._capacitor_stamps, self.capacitors
+            case Inductor():
+                return self._inductor_stamps, self.inductors
+            case Diode():
+                return self._nonlinear_stamps, self.diodes
+            case ConstantPowerLoad():
+                return self._nonlinear_stamps, self.constant_power_loads
+            case CurrentLimitedSource():
+                return self._nonlinear_stamps, self.current_limited_sources
+
+        raise TypeError(f"Unsupported component {component!r}")
 
     def get_node(self, id: int) -> Node:
-        while id >= len(self.nodes):
-            self.nodes.append(Node(len(self.nodes)))
+        if id >= len(self.nodes):
+            self.nodes.grow(id + 1)
+            self.invalidate()
 
         return self.nodes[id]
 
+    @property
+    def num_nodes(self) -> int:
+        # Number of non-reference nodes, i.e. the size of G
+        return len(self.nodes) - 1
+
+    @property
+    def num_branches(self) -> int:
+        # Number of branch currents solved for: voltage sources, then inductors
+        return len(self.ind_voltage_sources) + len(self._inductor_stamps)
+
+    def invalidate(self):
+        # Drop the cached factorization. Adding components does this already,
+        # and value changes are picked up by factorize().
+        self._lu = None
+        self._lu_values = None
+        self._lu_switch_conductances = None
+        self._lu_switch_delta = None
+        self._switch_columns.clear()
+        self._A = None
+        self._A_values = None
+        self._jacobian = None
+
+    def _companion(
+        self, dt: float | None, method: Integration
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # Capacitor companion conductances and inductor branch impedances for a
+        # time step of dt. A dt of None is the DC operating point, where a
+        # capacitor is open and an inductor is a short.
+        capacitance = self._capacitor_stamps.values("capacitance")
+        inductance = self._inductor_stamps.values("inductance")
+
+        if dt is None:
+            return np.zeros_like(capacitance), np.zeros_like(inductance)
+
+        scale = 2.0 if method == Integration.TRAPEZOIDAL else 1.0
+        return scale * capacitance / dt, scale * inductance / dt
+
+    def _values(
+        self, dt: float | None = None, method: Integration = Integration.TRAPEZOIDAL
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # Every value that goes into A: resistor conductances, capacitor
+        # companion conductances, inductor branch impedances and switch
+        # conductances
+        g_c, z_l = self._companion(dt, method)
+        return (
+            self._resistor_stamps.values("conductance"),
+            g_c,
+            z_l,
+            self._switch_stamps.values("conductance"),
+        )
+
+    def _G_triplets(
+        self,
+        g_r: np.ndarray | None = None,
+        g_c: np.ndarray | None = None,
+        g_s: np.ndarray | None = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if g_r is None:
+            g_r = self._resistor_stamps.values("conductance")
+
+        if g_c is None:
+            g_c = np.zeros(len(self._capacitor_stamps))
+
+        if g_s is None:
+            g_s = self._switch_stamps.values("conductance")
+
+        triplets = [
+            stamp_conductances(*stamps.terminals(), g)
+            for stamps, g in [
+                (self._resistor_stamps, g_r),
+                (self._capacitor_stamps, g_c),
+                (self._switch_stamps, g_s),
+            ]
+        ]
+        rows, cols, vals = zip(*triplets)
+        return np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+
+    def _B_triplets(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        v_rows, v_cols, v_vals = stamp_incidence(
+            *self._voltage_source_stamps.terminals()
+        )
+        l_rows, l_cols, l_vals = stamp_incidence(
+            *self._inductor_stamps.terminals(), offset=len(self.ind_voltage_sources)
+        )
+        return (
+            np.concatenate([v_rows, l_rows]),
+            np.concatenate([v_cols, l_cols]),
+            np.concatenate([v_vals, l_vals]),
+        )
+
+    def build_A(
+        self, dt: float | None = None, method: Integration = Integration.TRAPEZOIDAL
+    ) -> sparse.csc_array:
+        # The full MNA matrix [[G, B], [C, D]], assembled straight from the
+        # recorded stamps.
+        return self._assemble(*self._values(dt, method))
+
+    def _assemble(
+        self, g_r: np.ndarray, g_c: np.ndarray, z_l: np.ndarray, g_s: np.ndarray
+    ) -> sparse.csc_array:
+        n = self.num_nodes
+        m = self.num_branches
+
+        g_rows, g_cols, g_vals = self._G_triplets(g_r, g_c, g_s)
+        b_rows, b_cols, b_vals = self._B_triplets()
+
+        # D is -Z on the diagonal for inductor branches, zero for sources
+        d_index = n + len(self.ind_voltage_sources) + np.arange(len(z_l))
+
+        # todo C is B.T only when there are no dependent sources
+        rows = np.concatenate([g_rows, b_rows, b_cols + n, d_index])
+        cols = np.concatenate([g_cols, b_cols + n, b_rows, d_index])
+        vals = np.concatenate([g_vals, b_vals, b_vals, -z_l])
+
+        return sparse.coo_array((vals, (rows, cols)), shape=(n + m, n + m)).tocsc()
+
     def build_G(self) -> np.ndarray:
         # G is the conductance matrix
         # Diagonals: sum of conductance connected to each node
         # Others: negative of conductance spanning node pairs
-        # todo What about when two resistors are in parallel?
-        n = len(self.nodes) - 1  # ignore node 0
-        G = np.zeros((n, n))
-
-        for iy, ix in np.ndindex(G.shape):
-            if iy == ix:
-                node = self.nodes[iy + 1]
-                G[iy, ix] = sum(
-                    link.component.conductance
-                    for link in node.links
-                    if isinstance(link.component, Resistor)
-                )
-            else:
-                node_a = self.nodes[iy + 1]
-                node_b = self.nodes[ix + 1]
-                G[iy, ix] = sum(
-                    -component.conductance
-                    for component in node_a.spanning_components(node_b)
-                    if isinstance(component, Resistor)
-                )
-
-        return G
+        n = self.num_nodes
+        rows, cols, vals = self._G_triplets()
+        return sparse.coo_array((vals, (rows, cols)), shape=(n, n)).toarray()
 
     def build_B(self) -> np.ndarray:
-        # B identifies which independent voltage sources are into or out of
-        # each node.
-        n = len(self.nodes) - 1  # ignore node 0
-        m = len(self.ind_voltage_sources)
-        B = np.zeros((n, m))
-
-        for node in self.nodes[1:]:
-            for link in node.links:
-                if not isinstance(link.component, IndVoltageSource):
-                    continue
-
-                i = node.id - 1
-                j = self.ind_voltage_sources.index(link.component)
-                B[i, j] = 1 if link.pin == "p" else -1
-
-        return B
+        # B identifies which independent voltage sources (and inductors) are
+        # into or out of each node.
+        n = self.num_nodes
+        m = self.num_branches
+        rows, cols, vals = self._B_triplets()
+        return sparse.coo_array((vals, (rows, cols)), shape=(n, m)).toarray()
 
     def build_C(self) -> np.ndarray:
         # todo Only when there are no dependent voltage sources
@@ -141,46 +741,483 @@ class ElectricalNetwork:
 
     def build_D(self) -> np.ndarray:
         # todo Only when there are no dependent sources
-        m = len(self.ind_voltage_sources)
+        # At DC, inductor branches are shorts and D is all zeros
+        m = self.num_branches
         return np.zeros((m, m))
 
     def build_i(self) -> np.ndarray:
         # For each node, the sum of currents into that node
-        i = []
-        for node in self.nodes[1:]:
-            total = 0
-            for link in node.links:
-                if isinstance(link.component, IndCurrentSource):
-                    sign = 1 if link.pin == "p" else -1
-                    total += sign * link.component.current
+        return inject_currents(
+            self.num_nodes,
+            *self._current_source_stamps.terminals(),
+            self._current_source_stamps.values("current"),
+        )
 
-            i.append(total)
+    def build_e(self) -> np.ndarray:
+        # Voltages of independent voltage sources, then zero across each
+        # inductor at DC
+        return np.concat(
+            [
+                self._voltage_source_stamps.values("voltage"),
+                np.zeros(len(self._inductor_stamps)),
+            ]
+        )
 
-        return np.array(i)
+    def _history(self, dt: float, method: Integration) -> tuple[np.ndarray, np.ndarray]:
+        # Right-hand side terms carrying capacitor and inductor state from the
+        # previous step into the companion models
+        g_c, z_l = self._companion(dt, method)
+        v_c = self._capacitor_stamps.values("voltage")
+        i_c = self._capacitor_stamps.values("current")
+        v_l = self._inductor_stamps.values("voltage")
+        i_l = self._inductor_stamps.values("current")
 
-    def build_e(self) -> np.ndarray:
-        # Voltages of independent voltage sources
-        return np.array([ivs.voltage for ivs in self.ind_voltage_sources])
+        if method == Integration.TRAPEZOIDAL:
+            return g_c * v_c + i_c, -z_l * i_l - v_l
+
+        return g_c * v_c, -z_l * i_l
+
+    def factorize(
+        self, dt: float | None = None, method: Integration = Integration.TRAPEZOIDAL
+    ) -> Factorization:
+        # Reuse the LU factors of A unless a component was added or a value in
+        # A changed since they were computed. In transient analysis a fixed dt
+        # therefore factors A once. Switches that changed since are applied as
+        # a low-rank update, unless too many have changed.
+        values = self._values(dt, method)
+        g_s = values[-1]
+        flat = np.concat(values[:-1])
+
+        if self._lu is not None and np.array_equal(flat, self._lu_values):
+            delta = g_s - self._lu_switch_conductances
+            changed = np.flatnonzero(delta)
+
+            if len(changed) <= self.max_low_rank_updates:
+                if not np.array_equal(delta, self._lu_switch_delta):
+                    self._update_switches(changed, delta[changed])
+                    self._lu_switch_delta = delta
+
+                return self._lu
+
+        self._lu = Factorization(IslandLU(self._assemble(*values), self.executor))
+        self._lu_values = flat
+        self._lu_switch_conductances = g_s
+        self._lu_switch_delta = np.zeros_like(g_s)
+        self._switch_columns.clear()
+        self.factorization_count += 1
+        return self._lu
+
+    def islands(self) -> list[list[int]]:
+        # Ids of the nodes in each independently solved island, not counting
+        # ground, which every island shares
+        n = self.num_nodes
+        return [
+            [int(i) + 1 for i in island if i < n]
+            for island in self.factorize().lu.islands
+        ]
+
+    def _update_switches(self, changed: np.ndarray, delta: np.ndarray):
+        # Build the Woodbury correction for the changed switches. A^-1 u for
+        # each switch is cached, so toggling a switch back and forth only
+        # costs a back-substitution the first time.
+        size = self.num_nodes + self.num_branches
+        p, n = self._switch_stamps.terminals()
+        U = np.zeros((size, len(changed)))
+        W = np.zeros((size, len(changed)))
+
+        for k, j in enumerate(changed):
+            if j not in self._switch_columns:
+                u = np.zeros(size)
+                if p[j] >= 0:
+                    u[p[j]] += 1.0
+                if n[j] >= 0:
+                    u[n[j]] -= 1.0
+                self._switch_columns[j] = (u, self._lu.lu.solve(u))
+
+            U[:, k], W[:, k] = self._switch_columns[j]
+
+        self._lu.update(U, W, delta)
+
+    def build_z(self) -> np.ndarray:
+        return np.concat([self.build_i(), self.build_e()])
+
+    def _state(self) -> np.ndarray:
+        # The present solution, used to warm start Newton iteration
+        return np.concat(
+            [
+                self.nodes.voltages[1:],
+                self._voltage_source_stamps.values("current"),
+                self._inductor_stamps.values("current"),
+            ]
+        )
+
+    def _solve(
+        self,
+        z: np.ndarray,
+        dt: float | None = None,
+        method: Integration = Integration.TRAPEZOIDAL,
+    ) -> np.ndarray:
+        if len(self._nonlinear_stamps) == 0:
+            return self.factorize(dt, method).solve(z)
+
+        return self._newton(z, dt, method)
+
+    def _linear_matrix(self, dt: float | None, method: Integration):
+        # A at the present values, reassembled only when one of them changes.
+        # Switches are included directly rather than as low-rank updates.
+        values = self._values(dt, method)
+        flat = np.concat(values)
+
+        if self._A is not None and np.array_equal(flat, self._A_values):
+            return self._A
+
+        self._A = self._assemble(*values)
+        self._A_values = flat
+        self._jacobian = None
+
+        # The Jacobian is A plus a conductance stamp for every nonlinear
+        # component. Its sparsity pattern and islands only depend on the
+        # topology, so work them out once along with where each nonlinear
+        # stamp lands in the data array.
+        rows, cols, _ = stamp_conductances(
+            *self._nonlinear_stamps.terminals(), np.ones(len(self._nonlinear_stamps))
+        )
+        A = self._A.tocoo()
+        pattern = sparse.coo_array(
+            (
+                np.concat([A.data, np.zeros(len(rows))]),
+                (np.concat([A.row, rows]), np.concat([A.col, cols])),
+            ),
+            shape=A.shape,
+        ).tocsc()
+        pattern.sum_duplicates()
+
+        starts = pattern.indptr[cols]
+        self._jacobian_positions = np.array(
+            [
+                start
+                + np.searchsorted(pattern.indices[start : pattern.indptr[c + 1]], r)
+                for start, r, c in zip(starts, rows, cols)
+            ],
+            dtype=np.intp,
+        )
+        self._jacobian_pattern = pattern
+        self._jacobian_islands = find_islands(pattern)
+        return self._A
+
+    def _factor_jacobian(self, g: np.ndarray) -> IslandLU:
+        p, n = self._nonlinear_stamps.terminals()
+        data = self._jacobian_pattern.data.copy()
+        np.add.at(data, self._jacobian_positions, stamp_conductances(p, n, g)[2])
+
+        pattern = self._jacobian_pattern
+        J = sparse.csc_array((data, pattern.indices, pattern.indptr), pattern.shape)
+        self.factorization_count += 1
+        return IslandLU(J, self.executor, self._jacobian_islands)
+
+    def _junction_voltages(self, x: np.ndarray) -> np.ndarray:
+        # Voltage across each nonlinear component for the solution x
+        p, n = self._nonlinear_stamps.terminals()
+        voltages = np.append(x[: self.num_nodes], 0.0)
+        return voltages[p] - voltages[n]
+
+    def _evaluate_at(self, v: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Current through and conductance of each nonlinear component for the
+        # voltages across them
+        i, g = zip(
+            *(
+                c.evaluate(float(vk))
+                for c, vk in zip(self._nonlinear_stamps.components, v)
+            )
+        )
+        return np.array(i), np.array(g)
+
+    def _evaluate_nonlinear(
+        self, x: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        v = self._junction_voltages(x)
+        return v, *self._evaluate_at(v)
+
+    def _limit(self, v: np.ndarray, previous: np.ndarray) -> np.ndarray:
+        return np.array(
+            [
+                c.limit(float(vk), float(pk))
+                for c, vk, pk in zip(self._nonlinear_stamps.components, v, previous)
+            ]
+        )
+
+    def _newton(
+        self, z: np.ndarray, dt: float | None, method: Integration
+    ) -> np.ndarray:
+        # Solve A x + f(x) = z, where f holds the nonlinear component currents,
+        # starting from the last solution. The factored Jacobian is kept while
+        # each step shrinks the residual by newton_contraction, so a network
+        # near steady state costs a back-substitution or two per call.
+        #
+        # Like SPICE, each component is linearized around a voltage of its own,
+        # which every step may only move as far as the component's limit()
+        # allows. It starts from where the component last converged, or 0 V
+        # for a new one, so a diode added across a live node isn't evaluated
+        # far up its exponential.
+        A = self._linear_matrix(dt, method)
+        p, n = self._nonlinear_stamps.terminals()
+        size = A.shape[0]
+        tolerance = self.newton_tolerance * max(1.0, np.max(np.abs(z), initial=0.0))
+
+        def residual(x: np.ndarray, v: np.ndarray, i: np.ndarray, g: np.ndarray):
+            # Nonlinear currents leave p and enter n, so they add to A x. Each
+            # is taken from its linearization around v.
+            i_x = i + g * (self._junction_voltages(x) - v)
+            return A @ x + inject_currents(size, p, n, i_x) - z
+
+        num_nonlinear = len(self._nonlinear_stamps)
+        stored = self._converged_voltages
+        if len(stored) < num_nonlinear:
+            stored = np.append(stored, np.zeros(num_nonlinear - len(stored)))
+
+        x = self._state()
+        v = self._limit(self._junction_voltages(x), stored)
+        i, g = self._evaluate_at(v)
+        F = residual(x, v, i, g)
+
+        for iteration in range(self.max_newton_iterations):
+            v_x = self._junction_voltages(x)
+            if np.max(np.abs(F), initial=0.0) <= tolerance and np.array_equal(v, v_x):
+                self.newton_iterations = iteration
+                self._converged_voltages = v
+                return x
+
+            if self._jacobian is None:
+                self._jacobian = self._factor_jacobian(g)
+
+            x = x + self._jacobian.solve(-F)
+            v = self._limit(self._junction_voltages(x), v)
+            i, g = self._evaluate_at(v)
+            F_next = residual(x, v, i, g)
+
+            if np.linalg.norm(F_next) > self.newton_contraction * np.linalg.norm(F):
+                # The reused Jacobian has gone stale
+                self._jacobian = None
+
+            F = F_next
+
+        # Start over from 0 V next time rather than from where this gave up
+        self._converged_voltages = np.zeros(0)
+        self._jacobian = None
+        raise ConvergenceError(
+            f"Newton iteration did not converge in {self.max_newton_iterations} steps"
+        )
+
+    def _small_signal_conductances(self) -> np.ndarray:
+        # Nonlinear components linearized around the present operating point
+        if len(self._nonlinear_stamps) == 0:
+            return np.zeros(0)
+
+        x = self._state()
+        return self._evaluate_nonlinear(x)[2]
+
+    def ac_sweep(self, frequencies: np.ndarray, max_dense_size: int = 256) -> AcSweep:
+        # Small-signal AC analysis at every frequency in Hz, driven by the
+        # sources' ac_magnitude and ac_phase. Nonlinear components are
+        # linearized around the present operating point, so run() first.
+        #
+        # The admittance matrix is Y = A0 + jw A1, with capacitors and
+        # inductors in A1. Each island of up to max_dense_size rows is solved
+        # for all frequencies at once as a stack of dense complex systems.
+        # Larger islands are factored sparsely, one frequency at a time.
+        frequencies = np.atleast_1d(np.asarray(frequencies, dtype=float))
+        omega = 2 * np.pi * frequencies
+        n = self.num_nodes
+        m = self.num_branches
+        size = n + m
+
+        g_r, _, _, g_s = self._values()
+        A0 = self._assemble(
+            g_r,
+            np.zeros(len(self._capacitor_stamps)),
+            np.zeros(len(self._inductor_stamps)),
+            g_s,
+        )
+        if len(self._nonlinear_stamps):
+            rows, cols, vals = stamp_conductances(
+                *self._nonlinear_stamps.terminals(), self._small_signal_conductances()
+            )
+            A0 = A0 + sparse.coo_array((vals, (rows, cols)), shape=A0.shape).tocsc()
+
+        c_rows, c_cols, c_vals = stamp_conductances(
+            *self._capacitor_stamps.terminals(),
+            self._capacitor_stamps.values("capacitance"),
+        )
+        d_index = (
+            n + len(self.ind_voltage_sources) + np.arange(len(self._inductor_stamps))
+        )
+        A1 = sparse.coo_array(
+            (
+                np.concat([c_vals, -self._inductor_stamps.values("inductance")]),
+                (np.concat([c_rows, d_index]), np.concat([c_cols, d_index])),
+            ),
+            shape=(size, size),
+        ).tocsc()
+
+        z = np.concat([self._ac_currents(), self._ac_voltages()])
+
+        x = np.zeros((len(omega), size), dtype=complex)
+        pattern = abs(A0) + abs(A1)
+        pattern.eliminate_zeros()
+
+        for island in find_islands(pattern):
+            A0_island = A0[island][:, island]
+            A1_island = A1[island][:, island]
+            z_island = z[island]
+
+            if len(island) <= max_dense_size:
+                x[:, island] = self._dense_sweep(
+                    A0_island.toarray(), A1_island.toarray(), z_island, omega
+                )
+            else:
+                for k, w in enumerate(omega):
+                    Y = (A0_island + 1j * w * A1_island).tocsc()
+                    x[k, island] = splu(Y).solve(z_island)
+
+        voltages = np.zeros((len(omega), n + 1), dtype=complex)
+        voltages[:, 1:] = x[:, :n]
+        return AcSweep(frequencies, voltages, x[:, n:])
+
+    @staticmethod
+    def _dense_sweep(
+        A0: np.ndarray,
+        A1: np.ndarray,
+        z: np.ndarray,
+        omega: np.ndarray,
+        max_bytes: int = 64 * 2**20,
+    ) -> np.ndarray:
+        # Solve (A0 + jw A1) x = z for every w as stacked dense systems, in
+        # chunks of frequencies to bound memory
+        size = len(z)
+        chunk = max(1, max_bytes // (16 * size * size))
+        x = np.empty((len(omega), size), dtype=complex)
+
+        for start in range(0, len(omega), chunk):
+            w = omega[start : start + chunk]
+            Y = A0[None, :, :] + 1j * w[:, None, None] * A1[None, :, :]
+            rhs = np.broadcast_to(z, (len(w), size))[:, :, None]
+            x[start : start + chunk] = np.linalg.solve(Y, rhs)[:, :, 0]
+
+        return x
+
+    def _ac_currents(self) -> np.ndarray:
+        # AC current source phasors into each node
+        stamps = self._current_source_stamps
+        phasors = stamps.values("ac_magnitude") * np.exp(
+            1j * np.deg2rad(stamps.values("ac_phase"))
+        )
+        p, n = stamps.terminals()
+        return inject_currents(
+            self.num_nodes, p, n, phasors.real
+        ) + 1j * inject_currents(self.num_nodes, p, n, phasors.imag)
+
+    def _ac_voltages(self) -> np.ndarray:
+        # AC voltage source phasors, then zero across each inductor
+        stamps = self._voltage_source_stamps
+        phasors = stamps.values("ac_magnitude") * np.exp(
+            1j * np.deg2rad(stamps.values("ac_phase"))
+        )
+        return np.concat([phasors, np.zeros(len(self._inductor_stamps))])
+
+    def solve_batch(
+        self, i: np.ndarray | None = None, e: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # Solve the network for a stack of source configurations at once.
+        # i has shape (k, num_nodes) and e (k, num_branches), laid out like
+        # build_i() and build_e(). Either can be left out to use the present
+        # source values in every scenario. Nodes and sources are not updated;
+        # instead, this returns the node voltages with shape (k, len(nodes)),
+        # ground in column 0, and the branch currents with shape
+        # (k, num_branches).
+        if len(self._nonlinear_stamps):
+            raise ValueError("solve_batch() only supports linear networks")
+
+        i = np.atleast_2d(self.build_i() if i is None else i)
+        e = np.atleast_2d(self.build_e() if e is None else e)
+        k = max(len(i), len(e))
+        n = self.num_nodes
+        m = self.num_branches
+
+        z = np.concat([np.broadcast_to(i, (k, n)), np.broadcast_to(e, (k, m))], axis=1)
+        x = self.factorize().solve(np.ascontiguousarray(z.T))
+
+        voltages = np.zeros((k, n + 1))
+        voltages[:, 1:] = x[:n].T
+        return voltages, x[n:].T
 
     def run(self):
+        # DC operating point
         # based on https://lpsa.swarthmore.edu/Systems/Electrical/mna/MNA3.html
-        G = self.build_G()
-        B = self.build_B()
-        C = self.build_C()
-        D = self.build_D()
-        A = np.block([[G, B], [C, D]])
-
-        # todo This doesn't account for independent current sources
-        i = self.build_i()
+        x = self._solve(self.build_z())
+        self._update(x)
+
+        for capacitor in self._capacitor_stamps.components:
+            capacitor.current = 0.0
+
+    def step(self, dt: float, method: Integration = Integration.TRAPEZOIDAL):
+        # Advance a transient analysis by dt, e.g. the SceneTree delta. The
+        # starting point is the present capacitor voltages and inductor
+        # currents, so run() first to start from the DC operating point.
+        g_c, _ = self._companion(dt, method)
+        v_c = self._capacitor_stamps.values("voltage")
+        i_c = self._capacitor_stamps.values("current")
+        i_history, e_history = self._history(dt, method)
+
+        i = self.build_i() + inject_currents(
+            self.num_nodes, *self._capacitor_stamps.terminals(), i_history
+        )
         e = self.build_e()
-        z = np.concat([i, e])
+        e[len(self.ind_voltage_sources) :] = e_history
+
+        x = self._solve(np.concat([i, e]), dt, method)
+        v_c_next = self._update(x)
+
+        # Capacitor current follows from the companion model
+        i_c_next = g_c * (v_c_next - v_c)
+        if method == Integration.TRAPEZOIDAL:
+            i_c_next -= i_c
+
+        for capacitor, current in zip(self._capacitor_stamps.components, i_c_next):
+            capacitor.current = float(current)
+
+    def _update(self, x: np.ndarray) -> np.ndarray:
+        # Write a solution back to nodes and components. Returns the new
+        # capacitor voltages.
+        num_nodes = self.num_nodes
+        num_sources = len(self.ind_voltage_sources)
+
+        self.nodes.voltages[1:] = x[:num_nodes]
+
+        branch_currents = x[num_nodes:]
+        for source, current in zip(self.ind_voltage_sources, branch_currents):
+            source.current = float(current)
+
+        # Ground has index -1, so it picks up the trailing zero
+        voltages = np.append(x[:num_nodes], 0.0)
 
-        x = np.matmul(np.linalg.inv(A), z)
+        p, n = self._inductor_stamps.terminals()
+        for inductor, current, voltage in zip(
+            self._inductor_stamps.components,
+            branch_currents[num_sources:],
+            voltages[p] - voltages[n],
+        ):
+            inductor.current = float(current)
+            inductor.voltage = float(voltage)
 
-        num_nodes = len(self.nodes) - 1
+        p, n = self._nonlinear_stamps.terminals()
+        for component, voltage in zip(
+            self._nonlinear_stamps.components, voltages[p] - voltages[n]
+        ):
+            component.update(float(voltage))
 
-        for node in self.nodes[1:]:
-            node.voltage = x[node.id - 1]
+        p, n = self._capacitor_stamps.terminals()
+        v_c = voltages[p] - voltages[n]
+        for capacitor, voltage in zip(self._capacitor_stamps.components, v_c):
+            capacitor.voltage = float(voltage)
 
-        for i, source in enumerate(self.ind_voltage_sources):
-            source.current = x[i + num_nodes]
+        return v_c
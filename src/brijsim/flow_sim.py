@@ -1,10 +1,227 @@
+from collections import deque
+from collections.abc import Callable
 from dataclasses import dataclass
-from math import isclose
+from itertools import pairwise
+from math import inf, isclose
 
 import networkx as nx
+import numpy as np
+
+
+class FlowStore:
+    # Contiguous per-port arrays. FlowPorts are views into a store, so a whole
+    # model can be solved with a few vectorized reductions instead of walking
+    # Python objects. Several models can share one store, e.g. all the ships
+    # in a region, and are then solved together.
+    def __init__(self, capacity: int = 16):
+        self.size = 0
+        self.rate_capacity = np.zeros(capacity)
+        self.qty_capacity = np.zeros(capacity)
+        self.rate = np.zeros(capacity)
+        self.qty = np.zeros(capacity)
+        self.component = np.zeros(capacity, dtype=np.intp)
+
+        # Component labels are handed out to models sharing the store. Label
+        # 0 marks released slots, which are reused and never solved.
+        self.num_labels = 1
+        self.free_labels: list[int] = []
+        self.free_slots: list[int] = []
+
+        # Ports with watchers, by index, and their state before the last solve
+        self.watched: dict[int, FlowPort] = {}
+        self.watched_before: tuple[np.ndarray, ...] | None = None
+
+        # Ports whose inputs changed since the last solve and components whose
+        # storage moved in it. Anything else is quiescent: solving it again
+        # with the same dt would give the same rates, so it is skipped.
+        self.changed = np.zeros(capacity, dtype=bool)
+        self.moving = np.zeros(0, dtype=bool)
+        self.active = np.zeros(0, dtype=bool)
+        self.dt: float | None = None
+        self.solved_components = 0
+        self.skipped_components = 0
+
+        # What each port put into (positive) or took from its component in its
+        # last solve, and its quantity before that solve
+        self.supply = np.zeros(capacity)
+        self.previous_qty = np.zeros(capacity)
+
+    def append(
+        self, rate_capacity: float, qty_capacity: float, rate: float, qty: float
+    ) -> int:
+        if self.free_slots:
+            index = self.free_slots.pop()
+        else:
+            if self.size == len(self.rate):
+                self.reserve(2 * self.size)
+
+            index = self.size
+            self.size += 1
+
+        self.rate_capacity[index] = rate_capacity
+        self.qty_capacity[index] = qty_capacity
+        self.rate[index] = rate
+        self.qty[index] = qty
+        self.changed[index] = True
+        return index
+
+    def release(self, indices: list[int]):
+        self.rate_capacity[indices] = 0.0
+        self.qty_capacity[indices] = 0.0
+        self.rate[indices] = 0.0
+        self.qty[indices] = 0.0
+        self.component[indices] = 0
+        self.free_slots.extend(indices)
+        for index in indices:
+            self.watched.pop(index, None)
+
+    def new_label(self) -> int:
+        if self.free_labels:
+            return self.free_labels.pop()
+
+        self.num_labels += 1
+        return self.num_labels - 1
+
+    def free_label(self, label: int):
+        self.free_labels.append(label)
+
+    def reserve(self, capacity: int):
+        if capacity <= len(self.rate):
+            return
+
+        fields = (
+            "rate_capacity",
+            "qty_capacity",
+            "rate",
+            "qty",
+            "component",
+            "changed",
+            "supply",
+            "previous_qty",
+        )
+        for name in fields:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+
+    def relabel(self, indices: list[int], label: int):
+        self.component[indices] = label
+        self.changed[indices] = True
+
+    def solve(self, dt: float):
+        num_components = self.num_labels
+        n = self.size
+        component = self.component[:n]
+
+        if len(self.moving) < num_components:
+            self.moving = np.concat(
+                [self.moving, np.zeros(num_components - len(self.moving), dtype=bool)]
+            )
+
+        populated = np.bincount(component, minlength=num_components) > 0
+        active = self.moving[:num_components] | (
+            np.bincount(component, self.changed[:n], minlength=num_components) > 0
+        )
+        if dt != self.dt:
+            active[:] = True
+        active[0] = populated[0] = False
+
+        if self.watched:
+            watched = np.fromiter(self.watched, dtype=np.intp, count=len(self.watched))
+            self.watched_before = (
+                watched,
+                self.rate[watched],
+                self.qty[watched],
+                self.changed[watched],
+            )
+
+        ports = active[component]
+        if ports.all():
+            qty = self.qty[:n]
+            previous_qty = self.previous_qty[:n]
+            previous_qty[:] = qty
+            solve_flows(
+                self.rate_capacity[:n],
+                self.qty_capacity[:n],
+                self.rate[:n],
+                qty,
+                self.supply[:n],
+                component,
+                num_components,
+                dt,
+            )
+        else:
+            index = np.flatnonzero(ports)
+            component = component[index]
+            rate = self.rate[index]
+            qty = self.qty[index]
+            previous_qty = qty.copy()
+            supply = np.empty(len(index))
+            solve_flows(
+                self.rate_capacity[index],
+                self.qty_capacity[index],
+                rate,
+                qty,
+                supply,
+                component,
+                num_components,
+                dt,
+            )
+            self.rate[index] = rate
+            self.qty[index] = qty
+            self.supply[index] = supply
+            self.previous_qty[index] = previous_qty
+
+        moved = qty != previous_qty
+        self.moving[:num_components] = (
+            np.bincount(component, moved, minlength=num_components) > 0
+        )
+        self.changed[:n] = False
+        self.dt = dt
+        self.active = active
+        self.solved_components = int(np.count_nonzero(active & populated))
+        self.skipped_components = int(np.count_nonzero(~active & populated))
+
+    def notify_watchers(self):
+        # Tells watchers of ports that were set before the last solve, or
+        # that it (and any link limits after it) changed
+        if self.watched_before is None:
+            return
+
+        watched, rate, qty, changed = self.watched_before
+        self.watched_before = None
+        updated = changed | (self.rate[watched] != rate) | (self.qty[watched] != qty)
+
+        for index in watched[updated]:
+            port = self.watched.get(index)
+            if port is not None:
+                port.notify()
+
+
+class StoreField:
+    # A FlowPort attribute that lives in its store's array of the same name
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, port: "FlowPort", owner=None) -> float:
+        if port is None:
+            return self
+        return getattr(port.store, self.name)[port.index]
+
+    def __set__(self, port: "FlowPort", value: float):
+        values = getattr(port.store, self.name)
+        if values[port.index] != value:
+            values[port.index] = value
+            port.store.changed[port.index] = True
 
 
 class FlowPort:
+    rate_capacity = StoreField()
+    qty_capacity = StoreField()
+    rate = StoreField()
+    qty = StoreField()
+
     def __init__(
         self,
         rate_capacity: float,
@@ -14,13 +231,42 @@ class FlowPort:
         rate_unit: str = "W",
         qty_unit: str = "J",
     ):
-        self.rate_capacity = rate_capacity
-        self.qty_capacity = qty_capacity
-        self.rate = rate
-        self.qty = qty
+        # Until the port is added to a model it views a store of its own
+        self.store = FlowStore(1)
+        self.index = self.store.append(rate_capacity, qty_capacity, rate, qty)
         self.rate_unit = rate_unit
         self.qty_unit = qty_unit
 
+        # Called when a solve changes the port or its inputs were set
+        self.watchers: list[Callable[[], None]] = []
+
+    def bind(self, store: FlowStore):
+        # Move this port's values into another store and view them there
+        self.store.watched.pop(self.index, None)
+        self.index = store.append(
+            self.rate_capacity, self.qty_capacity, self.rate, self.qty
+        )
+        self.store = store
+
+        if self.watchers:
+            store.watched[self.index] = self
+
+    def watch(self, callback: Callable[[], None]):
+        if callback not in self.watchers:
+            self.watchers.append(callback)
+        self.store.watched[self.index] = self
+
+    def unwatch(self, callback: Callable[[], None]):
+        if callback in self.watchers:
+            self.watchers.remove(callback)
+
+        if not self.watchers:
+            self.store.watched.pop(self.index, None)
+
+    def notify(self):
+        for callback in list(self.watchers):
+            callback()
+
     def at_p_capacity(self):
         return isclose(self.rate, self.rate_capacity)
 
@@ -52,39 +298,401 @@ class FlowPort:
         return self.qty / self.qty_capacity if self.qty_capacity != 0.0 else 0.0
 
 
+def solve_flows(
+    rate_capacity: np.ndarray,
+    qty_capacity: np.ndarray,
+    rate: np.ndarray,
+    qty: np.ndarray,
+    supply: np.ndarray,
+    component: np.ndarray,
+    num_components: int,
+    dt: float,
+):
+    # Vectorized FlowModel.solve_connected_components for every component at
+    # once. Per-component sums are segment reductions over the component
+    # column, and each case's assignments are applied in the same order as the
+    # reference solver so ports in several roles end up with the same rate.
+    def total(weights: np.ndarray) -> np.ndarray:
+        return np.bincount(component, weights, minlength=num_components)[component]
+
+    def safe(denominator: np.ndarray) -> np.ndarray:
+        return np.where(denominator != 0.0, denominator, 1.0)
+
+    qty_open = qty_capacity - qty
+    source = rate_capacity > 0.0
+    sink = rate_capacity < 0.0
+    storage_source = qty > 0.0
+    storage_sink = qty_open > 0.0
+
+    source_capacity = total(np.where(source, rate_capacity, 0.0))
+    sink_demand = -total(np.where(sink, rate_capacity, 0.0))
+    storage_source_capacity = total(np.where(storage_source, qty / dt, 0.0))
+    storage_source_qty = total(np.where(storage_source, qty, 0.0))
+    storage_sink_qty_open = total(np.where(storage_sink, qty_open, 0.0))
+
+    surplus = source_capacity >= sink_demand
+    discharging = ~surplus & (source_capacity + storage_source_capacity >= sink_demand)
+    shortfall = ~surplus & ~discharging
+
+    rate[:] = 0.0
+    rate[sink & ~shortfall] = rate_capacity[sink & ~shortfall]
+
+    # Surplus: storage charges with the excess, in proportion to room left,
+    # and sources share the total supply in proportion to their capacity
+    storage_supply = np.minimum(
+        source_capacity - sink_demand, storage_sink_qty_open / dt
+    )
+    charge = surplus & storage_sink
+    rate[charge] = (-storage_supply * qty_open / safe(storage_sink_qty_open))[charge]
+    qty[charge] -= rate[charge] * dt
+
+    delivered = sink_demand + storage_supply
+    share = surplus & source
+    rate[share] = (delivered * rate_capacity / safe(source_capacity))[share]
+
+    # Otherwise sources run at capacity and storage covers the rest, in
+    # proportion to its quantity
+    rate[source & ~surplus] = rate_capacity[source & ~surplus]
+
+    discharge = discharging & storage_source
+    rate[discharge] = (
+        (sink_demand - source_capacity) * qty / safe(storage_source_qty)
+    )[discharge]
+    qty[discharge] -= rate[discharge] * dt
+
+    # Shortfall: storage empties and sinks share what supply there is
+    empty = shortfall & storage_source
+    emptied = qty[empty] / dt
+    rate[empty] = -emptied
+    qty[empty] = 0.0
+
+    available = source_capacity + storage_source_capacity
+    starve = shortfall & sink
+    rate[starve] = (available * rate_capacity / safe(sink_demand))[starve]
+
+    # Supply is the rate, except emptied storage whose rate is negated
+    supply[:] = rate
+    supply[empty & ~sink] = emptied[~sink[empty]]
+
+
 class FlowModel:
-    def __init__(self):
+    def __init__(self, store: FlowStore | None = None):
         self.graph = nx.Graph()
         self.node_ids: dict[FlowPort, str] = {}
+        self.store = store if store is not None else FlowStore()
+
+        # Connected components are kept up to date as ports are linked and
+        # unlinked. Each component's ports are cached by node id under a label
+        # from the store, and the store's component column holds every port's
+        # label.
+        self.components: dict[int, dict[str, FlowPort]] = {}
+
+        # Links with a finite throughput capacity, and what each port of a
+        # component with such links delivered in the last allocation. Edges
+        # carry their capacity and net flow from their tail port.
+        self.limited_links: set[tuple[str, str]] = set()
+        self.port_flows: dict[str, float] = {}
+        self.augmenting_paths = 0
+
+    @property
+    def num_components(self) -> int:
+        return len(self.components)
 
     def add_port(self, id: str, port: FlowPort) -> FlowPort:
         self.graph.add_node(id, port=port)
         self.node_ids[port] = id
+        port.bind(self.store)
+        self.new_component({id: port})
+        return port
+
+    def remove_port(self, port: str | FlowPort) -> FlowPort:
+        # The port keeps its values in a store of its own again
+        id = self.port_id(port)
+        for neighbor in list(self.graph.adj[id]):
+            if neighbor != id:
+                self.unlink_ports(id, neighbor)
+
+        label = self.label(id)
+        del self.components[label]
+        self.store.free_label(label)
+
+        port = self.graph.nodes[id]["port"]
+        index = port.index
+        port.bind(FlowStore(1))
+        self.store.release([index])
+
+        self.graph.remove_node(id)
+        del self.node_ids[port]
+        self.port_flows.pop(id, None)
         return port
 
-    def link_ports(self, port1: str | FlowPort, port2: str | FlowPort):
-        id1 = self.node_ids[port1] if isinstance(port1, FlowPort) else port1
-        id2 = self.node_ids[port2] if isinstance(port2, FlowPort) else port2
+    def port_id(self, port: str | FlowPort) -> str:
+        id = self.node_ids[port] if isinstance(port, FlowPort) else port
+
+        if not self.graph.has_node(id):
+            raise KeyError(f"Node {id} not found.")
+
+        return id
+
+    def link_ports(
+        self, port1: str | FlowPort, port2: str | FlowPort, capacity: float = inf
+    ):
+        self.link_ports_by_id(self.port_id(port1), self.port_id(port2), capacity)
+
+    def link_ports_by_id(self, id1: str, id2: str, capacity: float = inf):
+        self.graph.add_edge(id1, id2, capacity=capacity, flow=0.0, tail=id1)
+        self.limit_link(id1, id2, capacity)
+
+        label1 = self.label(id1)
+        label2 = self.label(id2)
+        if label1 == label2:
+            return
 
-        if not self.graph.has_node(id1):
-            raise KeyError(f"Node {id1} not found while linking ports.")
+        # Union by size: relabel the smaller component into the larger
+        if len(self.components[label1]) < len(self.components[label2]):
+            label1, label2 = label2, label1
 
-        if not self.graph.has_node(id2):
-            raise KeyError(f"Node {id2} not found while linking ports.")
+        merged = self.components.pop(label2)
+        self.relabel(merged, label1)
+        self.components[label1].update(merged)
+        self.store.free_label(label2)
 
-        self.link_ports_by_id(id1, id2)
+    def unlink_ports(self, port1: str | FlowPort, port2: str | FlowPort):
+        # Removes a link, e.g. when a valve closes, splitting the component
+        # in two if that link was the only path between the ports
+        id1 = self.port_id(port1)
+        id2 = self.port_id(port2)
 
-    def link_ports_by_id(self, id1: str, id2: str):
-        self.graph.add_edge(id1, id2)
+        if not self.graph.has_edge(id1, id2):
+            raise KeyError(f"Nodes {id1} and {id2} are not linked.")
+
+        self.graph.remove_edge(id1, id2)
+        self.limit_link(id1, id2, inf)
+
+        split = self.split_off(id1, id2)
+        if split is None:
+            return
+
+        component = self.components[self.label(id1)]
+        for id in split:
+            del component[id]
+
+        # Whichever end stays behind marks the remaining side for solving
+        for id in (id1, id2):
+            self.store.changed[self.graph.nodes[id]["port"].index] = True
+
+        self.new_component({id: self.graph.nodes[id]["port"] for id in split})
+
+    def set_link_capacity(
+        self, port1: str | FlowPort, port2: str | FlowPort, capacity: float
+    ):
+        id1 = self.port_id(port1)
+        id2 = self.port_id(port2)
+
+        if not self.graph.has_edge(id1, id2):
+            raise KeyError(f"Nodes {id1} and {id2} are not linked.")
+
+        self.graph.edges[id1, id2]["capacity"] = capacity
+        self.limit_link(id1, id2, capacity)
+
+    def limit_link(self, id1: str, id2: str, capacity: float):
+        link = (id1, id2) if id1 <= id2 else (id2, id1)
+        if capacity == inf:
+            self.limited_links.discard(link)
+        else:
+            self.limited_links.add(link)
+
+        for id in (id1, id2):
+            self.store.changed[self.graph.nodes[id]["port"].index] = True
+
+    def split_off(self, id1: str, id2: str) -> set[str] | None:
+        # Searches outwards from both ends of a removed link in lockstep. If
+        # the searches meet, the ports are still connected and None is
+        # returned. Otherwise the first search to run out has found the
+        # smaller side, so the cost is bounded by the part that splits off.
+        if id1 == id2:
+            return None
+
+        seen = ({id1}, {id2})
+        frontiers = ([id1], [id2])
+
+        while True:
+            for side, other in ((0, 1), (1, 0)):
+                if not frontiers[side]:
+                    return seen[side]
+
+                for neighbor in self.graph.adj[frontiers[side].pop()]:
+                    if neighbor in seen[other]:
+                        return None
+
+                    if neighbor not in seen[side]:
+                        seen[side].add(neighbor)
+                        frontiers[side].append(neighbor)
+
+    def label(self, id: str) -> int:
+        return int(self.store.component[self.graph.nodes[id]["port"].index])
+
+    def relabel(self, ports: dict[str, FlowPort], label: int):
+        self.store.relabel([port.index for port in ports.values()], label)
+
+    def new_component(self, ports: dict[str, FlowPort]):
+        label = self.store.new_label()
+        self.components[label] = ports
+        self.relabel(ports, label)
+
+    def bind(self, store: FlowStore):
+        # Moves every port into another store, e.g. a region's shared one,
+        # keeping components, links and flows
+        old_store = self.store
+        old_indices = [port.index for port in self.node_ids]
+        old_components = self.components
+
+        self.store = store
+        self.components = {}
+        for label, ports in old_components.items():
+            for port in ports.values():
+                port.bind(store)
+
+            self.new_component(ports)
+            old_store.free_label(label)
+
+        old_store.release(old_indices)
 
     def connected_nodes(self):
-        return nx.connected_components(self.graph)
+        return [set(ports) for ports in self.components.values()]
+
+    # Both counts cover the whole store when it is shared
+    @property
+    def solved_components(self) -> int:
+        return self.store.solved_components
+
+    @property
+    def skipped_components(self) -> int:
+        return self.store.skipped_components
 
     def step(self, dt: float):
-        for connected_nodes in nx.connected_components(self.graph):
-            self.solve_connected_components(
-                [self.graph.nodes[node]["port"] for node in connected_nodes], dt
+        self.store.solve(dt)
+        self.limit()
+        self.store.notify_watchers()
+
+    def limit(self):
+        # Applies link capacities to the components solved in the last step
+        for label in {self.label(id) for id, _ in self.limited_links}:
+            if self.store.active[label]:
+                self.limit_flows(self.components[label])
+
+    def limit_flows(self, ports: dict[str, FlowPort]):
+        # Fits a solved component's supplies and demands to what its links can
+        # carry. The solve's port supplies become the targets of a max-flow
+        # problem between suppliers and consumers. Demand a saturated link
+        # blocks is then rerouted from sources with rate capacity to spare,
+        # up to that capacity. Sources that end up giving more run at the
+        # higher rate. Ports that can only be partly served have their rate,
+        # and their quantity change, scaled by the fraction that gets through.
+        store = self.store
+        target = {id: float(store.supply[port.index]) for id, port in ports.items()}
+        spare = {
+            id: (
+                max(target[id], float(store.rate_capacity[port.index]))
+                if store.qty[port.index] == store.previous_qty[port.index]
+                else target[id]
             )
+            for id, port in ports.items()
+        }
+        edges = list(self.graph.edges(ports, data=True))
+        delivered = self.warm_start(spare, edges)
+
+        tolerance = 1e-12 * max(1.0, sum(map(abs, spare.values())))
+        while self.augment(target, delivered, tolerance):
+            pass
+        while self.augment(spare, delivered, tolerance):
+            pass
+
+        for id, port in ports.items():
+            self.port_flows[id] = delivered[id]
+
+            if delivered[id] - target[id] > tolerance and target[id] >= 0.0:
+                store.rate[port.index] = delivered[id]
+            elif abs(target[id] - delivered[id]) > tolerance:
+                fraction = delivered[id] / target[id]
+                change = store.qty[port.index] - store.previous_qty[port.index]
+                store.rate[port.index] *= fraction
+                store.qty[port.index] = store.previous_qty[port.index] + (
+                    change * fraction
+                )
+
+    def warm_start(
+        self, target: dict[str, float], edges: list[tuple[str, str, dict]]
+    ) -> dict[str, float]:
+        # Starts from the last tick's flows, scaled down just enough to fit
+        # the new supplies and link capacities. Scaling keeps flow conserved,
+        # so after small changes few augmenting paths are left to find. Flows
+        # left inconsistent by relinking are dropped instead.
+        delivered = {id: self.port_flows.get(id, 0.0) for id in target}
+        net = dict.fromkeys(target, 0.0)
+        scale = 1.0
+
+        for u, v, data in edges:
+            flow = data["flow"] if data["tail"] == u else -data["flow"]
+            net[u] += flow
+            net[v] -= flow
+            if flow != 0.0:
+                scale = min(scale, data["capacity"] / abs(flow))
+
+        for id, flow in delivered.items():
+            if not isclose(net[id], flow, abs_tol=1e-9):
+                scale = 0.0
+            elif flow != 0.0:
+                scale = min(scale, max(target[id] / flow, 0.0))
+
+        for _, _, data in edges:
+            data["flow"] *= scale
+
+        return {id: flow * scale for id, flow in delivered.items()}
+
+    def augment(
+        self, target: dict[str, float], delivered: dict[str, float], tolerance: float
+    ) -> bool:
+        # Pushes flow along one shortest augmenting path from a port with
+        # supply to spare to a port with unmet demand, if there is one
+        parents: dict[str, str | None] = {
+            id: None for id in target if target[id] - delivered[id] > tolerance
+        }
+        queue = deque(parents)
+
+        while queue:
+            u = queue.popleft()
+
+            if delivered[u] - target[u] > tolerance:
+                path = [u]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                path.reverse()
+                break
+
+            for v, data in self.graph.adj[u].items():
+                flow = data["flow"] if data["tail"] == u else -data["flow"]
+                if v not in parents and data["capacity"] - flow > tolerance:
+                    parents[v] = u
+                    queue.append(v)
+        else:
+            return False
+
+        source, sink = path[0], path[-1]
+        amount = min(target[source] - delivered[source], delivered[sink] - target[sink])
+        for u, v in pairwise(path):
+            data = self.graph.edges[u, v]
+            flow = data["flow"] if data["tail"] == u else -data["flow"]
+            amount = min(amount, data["capacity"] - flow)
+
+        self.augmenting_paths += 1
+        delivered[source] += amount
+        delivered[sink] -= amount
+        for u, v in pairwise(path):
+            data = self.graph.edges[u, v]
+            data["flow"] += amount if data["tail"] == u else -amount
+
+        return True
 
     def solve_connected_components(self, ports: list[FlowPort], dt: float):
         # Reset all ports
@@ -98,7 +706,7 @@ class FlowModel:
 
         storage_sources = [port for port in ports if port.qty > 0.0]
         storage_sinks = [port for port in ports if port.qty_open > 0.0]
-        storage_source_capacity = sum(port.qty * dt for port in storage_sources)
+        storage_source_capacity = sum(port.qty / dt for port in storage_sources)
         storage_source_qty = sum(port.qty for port in storage_sources)
         storage_sink_qty_open = sum(port.qty_open for port in storage_sinks)
 
@@ -149,7 +757,7 @@ class FlowModel:
 
             # All storage is emptied
             for storage_sources in storage_sources:
-                storage_sources.rate = -storage_sources.qty * dt
+                storage_sources.rate = -storage_sources.qty / dt
                 storage_sources.qty = 0.0
 
             # Supply is divided proportionally to capacity
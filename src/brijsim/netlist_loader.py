@@ -0,0 +1,263 @@
+import re
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from string import ascii_letters
+
+import numpy as np
+
+from brijsim.electrical_sim import (
+    Capacitor,
+    Component,
+    Diode,
+    ElectricalNetwork,
+    IndCurrentSource,
+    Inductor,
+    IndVoltageSource,
+    Resistor,
+)
+
+SCALE_SUFFIXES = {
+    "f": 1e-15,
+    "p": 1e-12,
+    "n": 1e-9,
+    "u": 1e-6,
+    "m": 1e-3,
+    "k": 1e3,
+    "meg": 1e6,
+    "g": 1e9,
+    "t": 1e12,
+    "mil": 25.4e-6,
+}
+
+# A number, an optional scale suffix and an optional unit, e.g. 100uF
+VALUE = r"([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|mil|[fpnumkgt])?(?:hz|ohms?|[fhvas])?"
+VALUE_PATTERN = re.compile(VALUE, re.IGNORECASE)
+UNITS = ("hz", "ohm", "ohms", "f", "h", "v", "a", "s")
+
+# Scale of every suffix and unit that can end a value, with a lone suffix
+# taking precedence, as in VALUE, so 1f is a femto and not a farad
+SUFFIX_SCALES = {"": 1.0} | SCALE_SUFFIXES
+for unit in UNITS:
+    SUFFIX_SCALES.setdefault(unit, 1.0)
+    for suffix, scale in SCALE_SUFFIXES.items():
+        SUFFIX_SCALES.setdefault(suffix + unit, scale)
+
+ELEMENTS = {"R": Resistor, "C": Capacitor, "L": Inductor}
+
+
+def parse_value(token: str) -> float:
+    # SPICE values can carry a scale suffix, e.g. 4.7k or 10meg, and a unit,
+    # which is ignored, e.g. 10uF.
+    # float() also takes digit separators, which SPICE doesn't
+    if token[-1].isdigit() and "_" not in token:
+        return float(token)
+
+    match = VALUE_PATTERN.fullmatch(token)
+    if match is None:
+        raise ValueError(f"Invalid value {token!r}")
+
+    number, suffix = match.groups()
+    return float(number) * SCALE_SUFFIXES.get((suffix or "").lower(), 1.0)
+
+
+def parse_values(tokens: list[str]) -> np.ndarray:
+    # parse_value for many tokens at once. Each token's scale suffix and unit
+    # come off its end together and are looked up in one table, and the
+    # numbers left are converted in one pass. Anything that pass doesn't take
+    # is left to parse_value, so both accept the same values.
+    try:
+        numbers = [token.rstrip(ascii_letters) for token in tokens]
+        scales = [
+            SUFFIX_SCALES[token[len(number) :].lower()]
+            for token, number in zip(tokens, numbers)
+        ]
+        if any("_" in number for number in numbers):
+            raise ValueError
+        values = np.fromiter(map(float, numbers), float, len(numbers))
+    except (ValueError, KeyError):
+        return np.array([parse_value(token) for token in tokens], dtype=float)
+
+    return values * scales
+
+
+def parse_node(token: str) -> int:
+    try:
+        node = int(token)
+    except ValueError:
+        if token.lower() == "gnd":
+            return 0
+        raise
+
+    if node < 0:
+        raise ValueError(f"Invalid node {token!r}")
+
+    return node
+
+
+def parse_nodes(tokens: list[str]) -> np.ndarray:
+    # parse_node for many tokens at once
+    return np.fromiter(
+        (int(token) if token.isdigit() else parse_node(token) for token in tokens),
+        np.intp,
+        len(tokens),
+    )
+
+
+def parse_source(tokens: list[str]) -> tuple[float, float, float]:
+    # DC value, AC magnitude and AC phase of a source, from e.g. "5",
+    # "DC 5" or "DC 5 AC 1 90". Anything left out is zero.
+    dc = ac_magnitude = ac_phase = 0.0
+    keywords = ("dc", "ac")
+    i = 0
+
+    if tokens and tokens[0].lower() not in keywords:
+        dc = parse_value(tokens[0])
+        i = 1
+
+    while i < len(tokens):
+        if tokens[i].lower() in keywords and i + 1 == len(tokens):
+            raise ValueError(f"Expected a value after {tokens[i]}")
+
+        match tokens[i].lower():
+            case "dc":
+                dc = parse_value(tokens[i + 1])
+                i += 2
+            case "ac":
+                ac_magnitude = parse_value(tokens[i + 1])
+                i += 2
+                if i < len(tokens) and tokens[i].lower() not in keywords:
+                    ac_phase = parse_value(tokens[i])
+                    i += 1
+            case _:
+                raise ValueError(f"Invalid source value {' '.join(tokens)!r}")
+
+    return dc, ac_magnitude, ac_phase
+
+
+def parse_lines[T](
+    parse_all: Callable[[list[str]], np.ndarray],
+    parse_one: Callable[[str], T],
+    tokens: list[str],
+    line_numbers: list[int],
+) -> np.ndarray:
+    # Parses tokens in bulk, but reports the line of the first bad one
+    try:
+        return parse_all(tokens)
+    except ValueError:
+        for token, line_number in zip(tokens, line_numbers):
+            try:
+                parse_one(token)
+            except ValueError as e:
+                raise ValueError(f"Line {line_number}: {e}") from e
+        raise
+
+
+class NetlistLoader:
+    # Loads SPICE-style netlists, one element per line:
+    #   Rname N+ N- Value
+    #   Cname N+ N- Value
+    #   Lname N+ N- Value
+    #   Vname N+ N- [DC] Value [AC Magnitude [Phase]]
+    #   Iname N+ N- [DC] Value [AC Magnitude [Phase]]
+    #   Dname N+ N- [Model]
+    # Lines starting with * are comments, other dot commands are ignored and
+    # .end stops reading. Lines are streamed, then the values and nodes of
+    # every line are parsed in bulk, and every element is added to the network
+    # in a single call at the end.
+    def load(self, filename: str | Path) -> ElectricalNetwork:
+        with Path(filename).open() as lines:
+            return self.load_lines(lines)
+
+    def load_lines(self, lines: Iterable[str]) -> ElectricalNetwork:
+        rows: list[list[str]] = []
+        line_numbers: list[int] = []
+
+        for line_number, line in enumerate(lines, start=1):
+            tokens = line.split()
+
+            if not tokens:
+                continue
+
+            first = tokens[0][0]
+            if first == "*":
+                continue
+
+            if first == ".":
+                if tokens[0].lower() == ".end":
+                    break
+                continue
+
+            rows.append(tokens)
+            line_numbers.append(line_number)
+
+        # Resistors, capacitors and inductors are the bulk of a netlist, so
+        # their values are parsed together. Sources and diodes are few and are
+        # parsed one by one.
+        types = [ELEMENTS.get(tokens[0][0].upper()) for tokens in rows]
+        parsed: dict[int, Component] = {}
+        irregular = [
+            i
+            for i, (tokens, type_) in enumerate(zip(rows, types))
+            if type_ is None or len(tokens) != 4
+        ]
+        for i in irregular:
+            try:
+                parsed[i] = self.parse_component(rows[i])
+            except (ValueError, IndexError) as e:
+                raise ValueError(f"Line {line_numbers[i]}: {e}") from e
+
+        simple = [i for i, type_ in enumerate(types) if type_ is not None]
+        values = parse_lines(
+            parse_values,
+            parse_value,
+            [rows[i][3] for i in simple],
+            [line_numbers[i] for i in simple],
+        )
+        for i, value in zip(simple, values.tolist()):
+            parsed[i] = types[i](rows[i][0], value)
+
+        nodes = parse_lines(
+            parse_nodes,
+            parse_node,
+            [token for tokens in rows for token in tokens[1:3]],
+            [number for number in line_numbers for _ in range(2)],
+        )
+
+        network = ElectricalNetwork()
+        network.add_components(
+            [parsed[i] for i in range(len(rows))], nodes[0::2], nodes[1::2]
+        )
+        return network
+
+    def parse_component(self, tokens: list[str]) -> Component:
+        name = tokens[0]
+
+        if len(tokens) < 3:
+            raise ValueError(f"Expected two nodes for {name}")
+
+        if name[0].upper() in ELEMENTS and len(tokens) != 4:
+            if len(tokens) == 3:
+                raise ValueError(f"Expected a value for {name}")
+            raise ValueError(f"Unexpected {' '.join(tokens[4:])!r} after {name}")
+
+        match name[0].upper():
+            case "R":
+                return Resistor(name, parse_value(tokens[3]))
+            case "C":
+                return Capacitor(name, parse_value(tokens[3]))
+            case "L":
+                return Inductor(name, parse_value(tokens[3]))
+            case "V":
+                dc, ac_magnitude, ac_phase = parse_source(tokens[3:])
+                return IndVoltageSource(
+                    name, voltage=dc, ac_magnitude=ac_magnitude, ac_phase=ac_phase
+                )
+            case "I":
+                dc, ac_magnitude, ac_phase = parse_source(tokens[3:])
+                return IndCurrentSource(
+                    name, current=dc, ac_magnitude=ac_magnitude, ac_phase=ac_phase
+                )
+            case "D":
+                return Diode(name)
+
+        raise ValueError(f"Unsupported element {name}")
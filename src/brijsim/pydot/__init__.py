@@ -1,5 +1,10 @@
 from .body_3d import Body3D, BoxShape3D
+from .broad_phase import BroadPhase
+from .main_loop import MainLoop, MainLoopStats
 from .node import Node
 from .node_3d import Node3D
+from .rigid_body_store import RigidBodyStore
 from .scene_tree import SceneTree
+from .signal import Signal
+from .spatial_grid import SpatialGrid
 from .vector3 import Vector3
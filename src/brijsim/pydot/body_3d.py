@@ -1,6 +1,15 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .node import Node
 from .node_3d import Node3D
+from .rigid_body_store import RigidBodyStore
 from .vector3 import Vector3
 
+if TYPE_CHECKING:
+    from .broad_phase import BroadPhase
+
 
 class Shape3D:
     pass
@@ -26,7 +35,71 @@ class Body3D(Node3D):
         rotation: Vector3 = Vector3.ZERO,
     ):
         super().__init__(name)
+        # Like transforms, motion lives in a store of its own until a region
+        # binds the body into the one it integrates
+        self.rigid_bodies = RigidBodyStore(1)
+        self.rigid_body_index = self.rigid_bodies.append(
+            self, mass, np.zeros(3), np.zeros(3)
+        )
         self.position = position
-        self.mass = mass
         self.shape = shape
         self.rotation = rotation
+
+        # The broad phase the body is in, if any, told when Body3D children
+        # come or go so it can recompute the box around them
+        self.broad_phase: BroadPhase | None = None
+
+    def add_child(self, child: Node):
+        super().add_child(child)
+        if isinstance(child, Body3D) and self.broad_phase is not None:
+            self.broad_phase.mark_dirty(self)
+
+    def remove_child(self, child: Node):
+        super().remove_child(child)
+        if isinstance(child, Body3D) and self.broad_phase is not None:
+            self.broad_phase.mark_dirty(self)
+
+    def bind_rigid_bodies(self, store: RigidBodyStore):
+        old_store = self.rigid_bodies
+        old_index = self.rigid_body_index
+
+        self.rigid_bodies = store
+        self.rigid_body_index = store.append(
+            self,
+            old_store.mass[old_index],
+            old_store.velocity[old_index],
+            old_store.angular_velocity[old_index],
+        )
+        store.force[self.rigid_body_index] = old_store.force[old_index]
+        old_store.release([old_index])
+
+    @property
+    def mass(self) -> float:
+        return float(self.rigid_bodies.mass[self.rigid_body_index])
+
+    @mass.setter
+    def mass(self, value: float):
+        self.rigid_bodies.mass[self.rigid_body_index] = value
+
+    @property
+    def velocity(self) -> Vector3:
+        return Vector3(*self.rigid_bodies.velocity[self.rigid_body_index].tolist())
+
+    @velocity.setter
+    def velocity(self, value: Vector3):
+        self.rigid_bodies.velocity[self.rigid_body_index] = (value.x, value.y, value.z)
+
+    @property
+    def angular_velocity(self) -> Vector3:
+        # Radians per second about each of the parent's axes
+        store = self.rigid_bodies
+        return Vector3(*store.angular_velocity[self.rigid_body_index].tolist())
+
+    @angular_velocity.setter
+    def angular_velocity(self, value: Vector3):
+        store = self.rigid_bodies
+        store.angular_velocity[self.rigid_body_index] = (value.x, value.y, value.z)
+
+    def apply_force(self, force: Vector3):
+        # Accumulated until the next integration step, then cleared
+        self.rigid_bodies.force[self.rigid_body_index] += (force.x, force.y, force.z)
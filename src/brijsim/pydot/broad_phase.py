@@ -0,0 +1,275 @@
+import numpy as np
+
+from .body_3d import Body3D
+from .transform_store import TransformStore, quaternion_rotate
+
+type Pair = tuple[Body3D, Body3D]
+
+AXES = np.eye(3)
+
+
+def local_bounds(body: Body3D) -> tuple[np.ndarray, np.ndarray]:
+    # Box around a body's own shape and its Body3D children's, e.g. a ship's
+    # rooms, in the body's frame. Children's rotations are ignored, and so is
+    # an empty shape, so a ship without one of its own doesn't stretch the
+    # box to its origin.
+    size = body.shape.size
+    half = np.abs([size.x, size.y, size.z]) / 2
+    boxes = [(-half, half)] if half.any() else []
+    for child in body.get_children_by_type(Body3D):
+        size = child.shape.size
+        half = np.abs([size.x, size.y, size.z]) / 2
+        center = child.transforms.position[child.transform_index]
+        boxes.append((center - half, center + half))
+
+    if not boxes:
+        return np.zeros(3), np.zeros(3)
+
+    lower, upper = zip(*boxes)
+    return np.min(lower, axis=0), np.max(upper, axis=0)
+
+
+def pair_keys(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    low, high = np.minimum(a, b), np.maximum(a, b)
+    return np.unique((low.astype(np.int64) << 32) | high)
+
+
+class BroadPhase:
+    # Sweep and prune over world-space boxes of bodies, along x. Each update
+    # reports the pairs that came within margin of each other or started
+    # overlapping since the last one, and the pairs that stopped. The sort
+    # starts from the last order, which is nearly sorted from tick to tick.
+    def __init__(self, margin: float = 0.0):
+        self.margin = margin
+        self.bodies: list[Body3D | None] = []
+        self.slots: dict[Body3D, int] = {}
+        self.free_slots: list[int] = []
+        self.released: list[int] = []
+        self.local_lower = np.zeros((0, 3))
+        self.local_upper = np.zeros((0, 3))
+        self.order = np.zeros(0, dtype=np.intp)
+
+        # Bodies whose Body3D children came or went since the last update.
+        # Bodies mark themselves here, so only their bounds are recomputed.
+        self.dirty: dict[Body3D, None] = {}
+
+        # Slots grouped by the transform store their bodies live in, rebuilt
+        # after bodies come or go or one of the stores releases slots. Each
+        # group also has the slots and store indices of its bodies' children,
+        # and the local positions their bounds were computed from.
+        self.groups: list[tuple[TransformStore, np.ndarray, np.ndarray]] = []
+        self.child_groups: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self.group_index: dict[TransformStore, int] = {}
+        self.groups_changed = True
+        self.release_counts: list[int] = []
+
+        # Sorted (low slot << 32 | high slot) keys of the current pairs
+        self.near_keys = np.zeros(0, dtype=np.int64)
+        self.overlap_keys = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def insert(self, body: Body3D):
+        if body in self.slots:
+            self.update_bounds(body)
+            return
+
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.bodies[slot] = body
+        else:
+            slot = len(self.bodies)
+            self.bodies.append(body)
+            self.local_lower = np.concat([self.local_lower, np.zeros((1, 3))])
+            self.local_upper = np.concat([self.local_upper, np.zeros((1, 3))])
+
+        self.slots[body] = slot
+        self.order = np.append(self.order, slot)
+        self.groups_changed = True
+        body.broad_phase = self
+        self.update_bounds(body)
+
+    def remove(self, body: Body3D):
+        # The slot's pairs are reported as ended by the next update, which
+        # frees it
+        slot = self.slots.pop(body, None)
+        if slot is not None:
+            body.broad_phase = None
+            self.dirty.pop(body, None)
+            self.order = self.order[self.order != slot]
+            self.released.append(slot)
+            self.groups_changed = True
+
+    def update_bounds(self, body: Body3D):
+        slot = self.slots[body]
+        self.local_lower[slot], self.local_upper[slot] = local_bounds(body)
+
+    def mark_dirty(self, body: Body3D):
+        self.dirty[body] = None
+
+    def regroup(self):
+        groups: dict[TransformStore, tuple[list[int], ...]] = {}
+        for body, slot in self.slots.items():
+            group = groups.setdefault(body.transforms, ([], [], [], []))
+            slots, indices, child_slots, child_indices = group
+            slots.append(slot)
+            indices.append(body.transform_index)
+            for child in body.get_children_by_type(Body3D):
+                child_slots.append(slot)
+                child_indices.append(child.transform_index)
+
+        self.groups = []
+        self.child_groups = []
+        self.group_index = {store: i for i, store in enumerate(groups)}
+        for store, (slots, indices, child_slots, child_indices) in groups.items():
+            self.groups.append(
+                (store, np.array(slots, np.intp), np.array(indices, np.intp))
+            )
+            child_indices = np.array(child_indices, np.intp)
+            self.child_groups.append(
+                (
+                    np.array(child_slots, np.intp),
+                    child_indices,
+                    store.position[child_indices],
+                )
+            )
+        self.groups_changed = False
+        self.release_counts = [store.release_count for store, *_ in self.groups]
+
+    def regroup_children(self, body: Body3D):
+        # Swaps a dirty body's entries in its group's child arrays for its
+        # current children's
+        i = self.group_index[body.transforms]
+        store = self.groups[i][0]
+        slots, indices, positions = self.child_groups[i]
+        slot = self.slots[body]
+        keep = slots != slot
+        children = np.array(
+            [child.transform_index for child in body.get_children_by_type(Body3D)],
+            dtype=np.intp,
+        )
+        self.child_groups[i] = (
+            np.concat([slots[keep], np.full(len(children), slot, dtype=np.intp)]),
+            np.concat([indices[keep], children]),
+            np.concat([positions[keep], store.position[children]]),
+        )
+
+    def refresh_bounds(self):
+        # Local bounds of bodies whose Body3D children came or went, or moved
+        # within them, since they were last computed. Regrouping is rare, so
+        # it recomputes them all rather than tracking what changed meanwhile.
+        if self.groups_changed or any(
+            store.release_count != count
+            for (store, *_), count in zip(self.groups, self.release_counts)
+        ):
+            self.regroup()
+            for body in self.slots:
+                self.update_bounds(body)
+            self.dirty = {}
+            return
+
+        for body in self.dirty:
+            self.update_bounds(body)
+            self.regroup_children(body)
+        self.dirty = {}
+
+        for (store, *_), (slots, indices, positions) in zip(
+            self.groups, self.child_groups
+        ):
+            current = store.position[indices]
+            moved = np.any(current != positions, axis=1)
+            if moved.any():
+                positions[moved] = current[moved]
+                for slot in np.unique(slots[moved]).tolist():
+                    self.update_bounds(self.bodies[slot])
+
+    def world_bounds(self) -> tuple[np.ndarray, np.ndarray]:
+        # Boxes around the bodies' local bounds once rotated into the world,
+        # in sweep order
+        self.refresh_bounds()
+
+        n = len(self.bodies)
+        position = np.zeros((n, 3))
+        rotation = np.zeros((n, 4))
+        for store, slots, indices in self.groups:
+            store.update()
+            position[slots] = store.world_position[indices]
+            rotation[slots] = store.world_rotation[indices]
+
+        position, rotation = position[self.order], rotation[self.order]
+        lower, upper = self.local_lower[self.order], self.local_upper[self.order]
+        center = position + quaternion_rotate(rotation, (lower + upper) / 2)
+        half = (upper - lower) / 2
+        half = sum(
+            np.abs(quaternion_rotate(rotation, AXES[axis] * half[:, axis, None]))
+            for axis in range(3)
+        )
+        return center - half, center + half
+
+    def update(self) -> tuple[list[Pair], list[Pair], list[Pair], list[Pair]]:
+        # Pairs that came near, stopped being near, started overlapping and
+        # stopped overlapping
+        near_keys, overlap_keys = self.find_pairs()
+
+        near = self.pairs(np.setdiff1d(near_keys, self.near_keys))
+        apart = self.pairs(np.setdiff1d(self.near_keys, near_keys))
+        touching = self.pairs(np.setdiff1d(overlap_keys, self.overlap_keys))
+        separated = self.pairs(np.setdiff1d(self.overlap_keys, overlap_keys))
+        self.near_keys = near_keys
+        self.overlap_keys = overlap_keys
+
+        for slot in self.released:
+            self.bodies[slot] = None
+        self.free_slots.extend(self.released)
+        self.released = []
+
+        return near, apart, touching, separated
+
+    def find_pairs(self) -> tuple[np.ndarray, np.ndarray]:
+        empty = np.zeros(0, dtype=np.int64)
+        if len(self.order) < 2:
+            return empty, empty
+
+        lower, upper = self.world_bounds()
+        resort = np.argsort(lower[:, 0], kind="stable")
+        if np.any(resort != np.arange(len(resort))):
+            self.order = self.order[resort]
+            lower, upper = lower[resort], upper[resort]
+
+        # Each box pairs with the boxes after it whose lower x is within its
+        # upper x plus the margin
+        n = len(self.order)
+        end = np.searchsorted(lower[:, 0], upper[:, 0] + self.margin, side="right")
+        counts = np.maximum(end - np.arange(1, n + 1), 0)
+        first = np.repeat(np.arange(n), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        second = first + 1 + offsets
+
+        gap = np.maximum(
+            lower[second] - upper[first], lower[first] - upper[second]
+        ).max(axis=1)
+        near = gap <= self.margin
+        overlap = gap <= 0
+
+        slots = self.order
+        return (
+            pair_keys(slots[first[near]], slots[second[near]]),
+            pair_keys(slots[first[overlap]], slots[second[overlap]]),
+        )
+
+    def pairs(self, keys: np.ndarray) -> list[Pair]:
+        return [
+            (self.bodies[key >> 32], self.bodies[key & 0xFFFFFFFF])
+            for key in keys.tolist()
+        ]
+
+    @property
+    def near_pairs(self) -> list[Pair]:
+        return self.pairs(self.near_keys)
+
+    @property
+    def overlapping_pairs(self) -> list[Pair]:
+        return self.pairs(self.overlap_keys)
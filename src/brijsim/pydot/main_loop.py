@@ -0,0 +1,95 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from .scene_tree import SceneTree
+
+
+@dataclass
+class MainLoopStats:
+    ticks: int = 0
+    steps: int = 0
+    skipped_steps: int = 0
+    overruns: int = 0  # Steps that took longer than dt to run
+    tick_duration: float = 0.0  # Wall time spent stepping in the last tick
+    lag: float = 0.0  # Real time not yet simulated after the last tick
+
+
+class MainLoop:
+    # Steps a scene tree at a fixed dt on the running asyncio event loop, so
+    # the simulation and anything else on the loop (e.g. websocket handlers)
+    # never run at the same time. Real time is accumulated and caught up with
+    # up to max_substeps steps per tick; anything beyond that is dropped and
+    # counted as skipped rather than letting the backlog grow.
+    def __init__(
+        self,
+        tree: SceneTree,
+        dt: float = 0.1,
+        max_substeps: int = 5,
+        clock: Callable[[], float] = time.perf_counter,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.tree = tree
+        self.dt = dt
+        self.max_substeps = max_substeps
+        self.clock = clock
+        self.sleep = sleep
+        self.accumulator = 0.0
+        self.stats = MainLoopStats()
+        self.task: asyncio.Task | None = None
+
+    def advance(self, elapsed: float) -> int:
+        self.accumulator += elapsed
+        # Tolerates rounding in the accumulated time
+        due = self.dt - 1e-9
+        start = self.clock()
+
+        steps = 0
+        step_start = start
+        while self.accumulator >= due and steps < self.max_substeps:
+            self.tree.process(self.dt)
+            self.accumulator -= self.dt
+            steps += 1
+            # Timed per step, as a tick that catches up runs several steps
+            step_end = self.clock()
+            if step_end - step_start > self.dt:
+                self.stats.overruns += 1
+            step_start = step_end
+
+        if self.accumulator >= due:
+            skipped = int((self.accumulator + 1e-9) // self.dt)
+            self.accumulator -= skipped * self.dt
+            self.stats.skipped_steps += skipped
+
+        duration = self.clock() - start
+        if steps:
+            self.stats.ticks += 1
+            self.stats.steps += steps
+            self.stats.tick_duration = duration
+        self.stats.lag = self.accumulator
+
+        return steps
+
+    @property
+    def interpolation_fraction(self) -> float:
+        # How far real time is into the next step, for interpolating views
+        return self.accumulator / self.dt
+
+    async def run(self):
+        last = self.clock()
+        while True:
+            await self.sleep(max(self.dt - self.accumulator, 0.0))
+            now = self.clock()
+            self.advance(now - last)
+            last = now
+
+    def start(self) -> asyncio.Task:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return self.task
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
@@ -13,6 +13,13 @@ class Node:
         self.children: list[Node] = []
         self.scene_tree: SceneTree | None = None
 
+        # Seconds between process calls, or 0 for every tick. Each call gets
+        # the time since the last one. Sleeping nodes aren't processed until
+        # woken.
+        self.process_interval = 0.0
+        self.process_elapsed = 0.0
+        self.sleeping = False
+
     def add_child(self, child: "Node"):
         if child in self.children:
             return
@@ -25,15 +32,50 @@ class Node:
 
         child.scene_tree = self.scene_tree
 
+    def remove_child(self, child: "Node"):
+        if child not in self.children:
+            return
+
+        self.children.remove(child)
+        child.parent = None
+
+        if self.scene_tree:
+            self._recursively_remove_from_scene_tree(child)
+
     def _recursively_add_to_scene_tree(self, node: Self):
-        self.scene_tree.node_uuid_map[node.uuid] = node
-        node.scene_tree = self.scene_tree
+        self.scene_tree.register(node)
 
         for child in node.children:
             self._recursively_add_to_scene_tree(child)
 
+    def _recursively_remove_from_scene_tree(self, node: Self):
+        for child in node.children:
+            self._recursively_remove_from_scene_tree(child)
+
+        self.scene_tree.unregister(node)
+
     def process(self, delta: float):
         pass
 
+    def physics_process(self, delta: float):
+        pass
+
+    def sleep(self):
+        if self.sleeping:
+            return
+
+        self.sleeping = True
+        self.process_elapsed = 0.0
+        if self.scene_tree:
+            self.scene_tree.running_changed = True
+
+    def wake(self):
+        if not self.sleeping:
+            return
+
+        self.sleeping = False
+        if self.scene_tree:
+            self.scene_tree.running_changed = True
+
     def get_children_by_type[T](self, type_: type[T]) -> list[T]:
         return [child for child in self.children if isinstance(child, type_)]
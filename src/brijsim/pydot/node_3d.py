@@ -1,6 +1,10 @@
-import glm
-from SpatialTransform import Transform
+import numpy as np
 
+from brijsim.pydot.transform_store import (
+    TransformStore,
+    euler_from_quaternion,
+    quaternion_from_euler,
+)
 from brijsim.pydot.vector3 import Vector3
 
 from .node import Node
@@ -9,28 +13,91 @@ from .node import Node
 class Node3D(Node):
     def __init__(self, name: str):
         super().__init__(name)
-        self.transform: Transform = Transform(self.name)
+        # Until the node is attached under another Node3D it is the root of a
+        # transform store of its own. Attaching moves its whole Node3D
+        # subtree into the parent's store.
+        self.transforms = TransformStore(1)
+        self.transform_index = self.transforms.append(
+            self, -1, np.zeros(3), np.array([1.0, 0.0, 0.0, 0.0])
+        )
 
     def add_child(self, child: Node):
         super().add_child(child)
         if isinstance(child, Node3D):
-            # https://github.com/Wasserwecken/spatial-transform/issues/4
-            position = child.transform.Position
-            self.transform.attach(child.transform)
-            child.transform.Position = position
+            child.bind_transforms(self.transforms, self.transform_index)
+
+    def remove_child(self, child: Node):
+        super().remove_child(child)
+        if isinstance(child, Node3D):
+            child.bind_transforms(TransformStore(), -1)
+
+    def bind_transforms(self, store: TransformStore, parent: int):
+        # Moves this node and its Node3D descendants into another store, under
+        # the given parent slot, keeping their local transforms
+        old_store = self.transforms
+        old_index = self.transform_index
+
+        self.transforms = store
+        self.transform_index = store.append(
+            self,
+            parent,
+            old_store.position[old_index],
+            old_store.rotation[old_index],
+        )
+
+        for child in self.children:
+            if isinstance(child, Node3D):
+                child.bind_transforms(store, self.transform_index)
+
+        old_store.release([old_index])
 
     @property
     def position(self) -> Vector3:
-        return Vector3(*self.transform.Position.to_list())
+        return Vector3(*self.transforms.position[self.transform_index].tolist())
 
     @position.setter
     def position(self, value: Vector3):
-        self.transform.Position = glm.vec3(value.x, value.y, value.z)
+        self.transforms.position[self.transform_index] = (value.x, value.y, value.z)
+        self.transforms.mark_dirty(self.transform_index)
+
+    @property
+    def rotation(self) -> Vector3:
+        # Local rotation as Euler angles in radians, applied about x, then y,
+        # then z
+        return Vector3(*euler_from_quaternion(self.quaternion))
+
+    @rotation.setter
+    def rotation(self, value: Vector3):
+        self.quaternion = quaternion_from_euler(value.x, value.y, value.z)
+
+    @property
+    def quaternion(self) -> np.ndarray:
+        # Local rotation as a w, x, y, z unit quaternion
+        return self.transforms.rotation[self.transform_index].copy()
+
+    @quaternion.setter
+    def quaternion(self, value: np.ndarray):
+        self.transforms.rotation[self.transform_index] = value
+        self.transforms.mark_dirty(self.transform_index)
+
+    @property
+    def global_position_array(self) -> np.ndarray:
+        # A read-only view of the world position, valid until the next change
+        self.transforms.update()
+        view = self.transforms.world_position[self.transform_index]
+        view.flags.writeable = False
+        return view
 
     @property
     def global_position(self) -> Vector3:
-        return Vector3(*self.transform.PositionWorld.to_list())
+        self.transforms.update()
+        return Vector3(*self.transforms.world_position[self.transform_index].tolist())
 
     @global_position.setter
     def global_position(self, value: Vector3):
-        self.transform.PositionWorld = glm.vec3(value.x, value.y, value.z)
+        store = self.transforms
+        index = self.transform_index
+        store.position[index] = store.to_local(
+            store.parent[index], np.array([value.x, value.y, value.z])
+        )
+        store.mark_dirty(index)
@@ -0,0 +1,139 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .transform_store import TransformStore, quaternion_multiply
+
+if TYPE_CHECKING:
+    from .body_3d import Body3D
+
+
+class RigidBodyStore:
+    # Masses, velocities and accumulated forces of Body3Ds in contiguous
+    # arrays, integrated in one batched semi-implicit Euler pass per step.
+    # Velocities are in the parent's frame. Only moving bodies' local
+    # transforms are written, and their world transforms are left for the
+    # transform store to bring up to date when they are next read.
+    def __init__(self, capacity: int = 16):
+        self.size = 0
+        self.nodes: list[Body3D | None] = []
+        self.live = np.zeros(capacity, dtype=bool)
+        self.mass = np.zeros(capacity)
+        self.velocity = np.zeros((capacity, 3))
+        self.angular_velocity = np.zeros((capacity, 3))
+        self.force = np.zeros((capacity, 3))
+        self.free_slots: list[int] = []
+
+        # Slots grouped by the transform store their bodies live in, rebuilt
+        # after slots change or one of the stores releases slots
+        self.groups: list[tuple[TransformStore, np.ndarray, np.ndarray]] = []
+        self.groups_changed = True
+        self.release_counts: list[int] = []
+
+    def append(
+        self,
+        node: "Body3D",
+        mass: float,
+        velocity: np.ndarray,
+        angular_velocity: np.ndarray,
+    ) -> int:
+        if self.free_slots:
+            index = self.free_slots.pop()
+            self.nodes[index] = node
+        else:
+            if self.size == len(self.mass):
+                self.reserve(2 * self.size)
+
+            index = self.size
+            self.size += 1
+            self.nodes.append(node)
+
+        self.live[index] = True
+        self.mass[index] = mass
+        self.velocity[index] = velocity
+        self.angular_velocity[index] = angular_velocity
+        self.force[index] = 0.0
+        self.groups_changed = True
+        return index
+
+    def release(self, indices: list[int]):
+        for index in indices:
+            self.nodes[index] = None
+
+        self.live[indices] = False
+        self.mass[indices] = 0.0
+        self.velocity[indices] = 0.0
+        self.angular_velocity[indices] = 0.0
+        self.force[indices] = 0.0
+        self.free_slots.extend(indices)
+        self.groups_changed = True
+
+    def reserve(self, capacity: int):
+        if capacity <= len(self.mass):
+            return
+
+        for name in ("live", "mass", "velocity", "angular_velocity", "force"):
+            old = getattr(self, name)
+            new = np.zeros((capacity, *old.shape[1:]), dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+
+    def regroup(self):
+        groups: dict[TransformStore, tuple[list[int], list[int]]] = {}
+        for index, node in enumerate(self.nodes):
+            if node is not None:
+                slots, transform_indices = groups.setdefault(node.transforms, ([], []))
+                slots.append(index)
+                transform_indices.append(node.transform_index)
+
+        self.groups = [
+            (store, np.array(slots, dtype=np.intp), np.array(indices, dtype=np.intp))
+            for store, (slots, indices) in groups.items()
+        ]
+        self.groups_changed = False
+        self.release_counts = [store.release_count for store, *_ in self.groups]
+
+    def integrate(self, dt: float):
+        n = self.size
+        if n == 0:
+            return
+
+        # Bodies without mass ignore forces but keep any velocity they're given
+        mass = self.mass[:n]
+        inverse_mass = np.divide(1.0, mass, out=np.zeros(n), where=mass > 0)
+        velocity = self.velocity[:n]
+        angular_velocity = self.angular_velocity[:n]
+        velocity += self.force[:n] * (inverse_mass * dt)[:, None]
+        self.force[:n] = 0.0
+
+        moving = self.live[:n] & (velocity.any(axis=1) | angular_velocity.any(axis=1))
+        if not moving.any():
+            return
+
+        if self.groups_changed or any(
+            store.release_count != count
+            for (store, *_), count in zip(self.groups, self.release_counts)
+        ):
+            self.regroup()
+
+        for store, slots, transform_indices in self.groups:
+            selected = moving[slots]
+            slots = slots[selected]
+            index = transform_indices[selected]
+            if len(index) == 0:
+                continue
+
+            store.position[index] += velocity[slots] * dt
+
+            spinning = angular_velocity[slots].any(axis=1)
+            if spinning.any():
+                index = index[spinning]
+                omega = np.zeros((len(index), 4))
+                omega[:, 1:] = angular_velocity[slots[spinning]]
+                rotation = store.rotation[index]
+                rotation += 0.5 * dt * quaternion_multiply(omega, rotation)
+                rotation /= np.linalg.norm(rotation, axis=1)[:, None]
+                store.rotation[index] = rotation
+
+            store.dirty[transform_indices[selected]] = True
+            store.any_dirty = True
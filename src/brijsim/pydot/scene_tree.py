@@ -1,34 +1,135 @@
+from collections.abc import Callable
 from typing import Type, TypeVar
 
 from .node import Node
+from .signal import Signal
 
 T = TypeVar("T")
 
 
 class SceneTree:
-    def __init__(self):
-        self.root = SceneTreeRoot("root", self)
+    def __init__(self, physics_dt: float | None = None):
         self.process_time = 0.0
         self.node_uuid_map: dict[str, Node] = {}
 
+        # Every node in the tree is indexed under each class in its MRO, so
+        # type queries don't walk the tree
+        self.nodes_by_type: dict[type, dict[Node, None]] = {}
+        self.node_added: Signal[Node] = Signal()
+        self.node_removed: Signal[Node] = Signal()
+
+        # Post-order list of the nodes that override Node.process, rebuilt on
+        # the next tick after the hierarchy changes, and the ones that are
+        # awake, refiltered after a node sleeps or wakes
+        self.schedule: list[Node] = []
+        self.running: list[Node] = []
+        self.schedule_changed = True
+        self.running_changed = True
+
+        # Nodes overriding Node.physics_process are stepped after the others
+        # at a fixed physics_dt, as many times as fit in each tick, or once
+        # with the tick's delta if physics_dt is None. Time left over carries
+        # to the next tick and gives the physics interpolation fraction.
+        self.physics_dt = physics_dt
+        self.physics_time = 0.0
+        self.physics_schedule: list[Callable[[float], None]] = []
+
+        self.root = SceneTreeRoot("root", self)
+        self.register(self.root)
+
     def add_child(self, child: Node):
         self.root.add_child(child)
 
+    def register(self, node: Node):
+        self.node_uuid_map[node.uuid] = node
+        node.scene_tree = self
+
+        for type_ in type(node).__mro__:
+            self.nodes_by_type.setdefault(type_, {})[node] = None
+
+        self.schedule_changed = True
+        self.node_added.emit(node)
+
+    def unregister(self, node: Node):
+        self.node_uuid_map.pop(node.uuid, None)
+        node.scene_tree = None
+
+        for type_ in type(node).__mro__:
+            self.nodes_by_type[type_].pop(node, None)
+
+        self.schedule_changed = True
+        self.node_removed.emit(node)
+
     def process(self, delta: float):
+        if self.schedule_changed:
+            self.build_schedule()
+
+        if self.running_changed:
+            self.running = [node for node in self.schedule if not node.sleeping]
+            self.running_changed = False
+
+        for node in self.running:
+            interval = node.process_interval
+            if not interval:
+                node.process(delta)
+                continue
+
+            node.process_elapsed += delta
+            if node.process_elapsed >= interval - 1e-9:
+                elapsed = node.process_elapsed
+                node.process_elapsed = 0.0
+                node.process(elapsed)
+
+        self.physics_process(delta)
+        self.process_time += delta
+
+    def physics_process(self, delta: float):
+        if self.physics_dt is None:
+            for physics_process in self.physics_schedule:
+                physics_process(delta)
+            return
+
+        self.physics_time += delta
+        steps = int((self.physics_time + 1e-9) // self.physics_dt)
+        self.physics_time = max(self.physics_time - steps * self.physics_dt, 0.0)
+
+        dt = self.physics_dt
+        schedule = self.physics_schedule
+        for _ in range(steps):
+            for physics_process in schedule:
+                physics_process(dt)
+
+    @property
+    def physics_fraction(self) -> float:
+        # How far into the next physics step the tree is, for interpolating
+        return self.physics_time / self.physics_dt if self.physics_dt else 0.0
+
+    def build_schedule(self):
+        self.schedule = []
+        self.physics_schedule = []
         for child in self.root.children:
-            self._process_child(child, delta)
+            self._schedule_child(child)
 
-        self.process_time += delta
+        self.schedule_changed = False
+        self.running_changed = True
 
-    def _process_child(self, child: Node, delta: float):
+    def _schedule_child(self, child: Node):
         for _child in child.children:
-            self._process_child(_child, delta)
+            self._schedule_child(_child)
+
+        if type(child).process is not Node.process:
+            self.schedule.append(child)
 
-        child.process(delta)
+        if type(child).physics_process is not Node.physics_process:
+            self.physics_schedule.append(child.physics_process)
 
     def find_nodes_by_type(
         self, type_: Type[T], current: Node | None = None, found: set[T] | None = None
     ) -> set[T]:
+        if current is None and found is None:
+            return set(self.nodes_by_type.get(type_, ()))
+
+        # Searching below a given node still walks its subtree
         if current is None:
             current = self.root
 
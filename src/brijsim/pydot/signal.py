@@ -0,0 +1,18 @@
+from collections.abc import Callable
+
+
+class Signal[*Ts]:
+    # Like a Godot signal: callbacks connected to it are called on every emit
+    def __init__(self):
+        self.callbacks: list[Callable[[*Ts], None]] = []
+
+    def connect(self, callback: Callable[[*Ts], None]):
+        if callback not in self.callbacks:
+            self.callbacks.append(callback)
+
+    def disconnect(self, callback: Callable[[*Ts], None]):
+        self.callbacks.remove(callback)
+
+    def emit(self, *args: *Ts):
+        for callback in list(self.callbacks):
+            callback(*args)
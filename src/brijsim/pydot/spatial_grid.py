@@ -0,0 +1,177 @@
+from collections.abc import Iterable, Iterator
+from itertools import product
+from math import floor
+
+import numpy as np
+
+from .body_3d import Body3D
+from .transform_store import TransformStore
+from .vector3 import Vector3
+
+type Cell = tuple[int, int, int]
+
+
+class SpatialGrid:
+    # Uniform grid over the axis-aligned bounds of bodies, i.e. their global
+    # position plus or minus half their shape's size (rotation is ignored).
+    # Each body is filed under every cell its bounds touch. Bounds are
+    # refreshed lazily before a query, only for bodies whose world transform
+    # changed since the last one.
+    def __init__(self, cell_size: float = 4.0):
+        self.cell_size = cell_size
+        self.cells: dict[Cell, dict[Body3D, None]] = {}
+        self.bounds: dict[Body3D, tuple[np.ndarray, np.ndarray]] = {}
+        self.cell_ranges: dict[Body3D, tuple[Cell, Cell]] = {}
+
+        # Bodies grouped by transform store, with the world versions their
+        # bounds were computed from. Regrouped after bodies are added or
+        # removed or one of the stores releases slots.
+        self.groups: list[tuple[TransformStore, np.ndarray, list[Body3D], np.ndarray]]
+        self.groups = []
+        self.groups_changed = False
+        self.release_counts: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.bounds)
+
+    @property
+    def bodies(self) -> Iterable[Body3D]:
+        return self.bounds.keys()
+
+    def insert(self, body: Body3D):
+        if body not in self.bounds:
+            self.bounds[body] = (np.zeros(3), np.zeros(3))
+            self.groups_changed = True
+
+    def remove(self, body: Body3D):
+        if self.bounds.pop(body, None) is None:
+            return
+
+        lower, upper = self.cell_ranges.pop(body, ((0, 0, 0), (-1, -1, -1)))
+        for cell in self.cell_range(lower, upper):
+            self.cells[cell].pop(body, None)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+        self.groups_changed = True
+
+    def refresh(self):
+        if self.groups_changed or any(
+            store.release_count != count
+            for (store, *_), count in zip(self.groups, self.release_counts)
+        ):
+            self.regroup()
+
+        for store, indices, bodies, versions in self.groups:
+            store.update()
+            current = store.world_version[indices]
+            moved = np.flatnonzero(current != versions)
+            versions[moved] = current[moved]
+
+            for i in moved:
+                self.place(bodies[i])
+
+    def regroup(self):
+        groups: dict[TransformStore, list[Body3D]] = {}
+        for body in self.bounds:
+            groups.setdefault(body.transforms, []).append(body)
+
+        self.groups = [
+            (
+                store,
+                np.array([body.transform_index for body in bodies], dtype=np.intp),
+                bodies,
+                np.full(len(bodies), -1, dtype=np.int64),
+            )
+            for store, bodies in groups.items()
+        ]
+        self.groups_changed = False
+        self.release_counts = [store.release_count for store, *_ in self.groups]
+
+    def place(self, body: Body3D):
+        center = body.transforms.world_position[body.transform_index]
+        size = body.shape.size
+        half = np.abs([size.x, size.y, size.z]) / 2
+        lower, upper = center - half, center + half
+        self.bounds[body] = (lower, upper)
+
+        cell_range = (self.cell(lower), self.cell(upper))
+        old_range = self.cell_ranges.get(body)
+        if cell_range == old_range:
+            return
+
+        if old_range is not None:
+            for cell in self.cell_range(*old_range):
+                self.cells[cell].pop(body, None)
+                if not self.cells[cell]:
+                    del self.cells[cell]
+
+        for cell in self.cell_range(*cell_range):
+            self.cells.setdefault(cell, {})[body] = None
+
+        self.cell_ranges[body] = cell_range
+
+    def cell(self, point: Iterable[float]) -> Cell:
+        x, y, z = (floor(value / self.cell_size) for value in point)
+        return x, y, z
+
+    def cell_range(self, lower: Cell, upper: Cell) -> Iterator[Cell]:
+        return product(*(range(lo, hi + 1) for lo, hi in zip(lower, upper)))
+
+    def candidates(self, lower: np.ndarray, upper: np.ndarray) -> Iterable[Body3D]:
+        lower_cell, upper_cell = self.cell(lower), self.cell(upper)
+        num_cells = np.prod(np.subtract(upper_cell, lower_cell) + 1)
+
+        # Past a point checking every body beats visiting every cell
+        if num_cells > len(self.cells):
+            return self.bounds.keys()
+
+        found: dict[Body3D, None] = {}
+        for cell in self.cell_range(lower_cell, upper_cell):
+            found.update(self.cells.get(cell, {}))
+        return found
+
+    def query_point[T: Body3D](
+        self, point: Vector3, type_: type[T] = Body3D
+    ) -> list[T]:
+        self.refresh()
+        p = np.array([point.x, point.y, point.z])
+        return [
+            body
+            for body in self.cells.get(self.cell(p), ())
+            if isinstance(body, type_)
+            and np.all(self.bounds[body][0] <= p)
+            and np.all(p <= self.bounds[body][1])
+        ]
+
+    def query_box[T: Body3D](
+        self, lower: Vector3, upper: Vector3, type_: type[T] = Body3D
+    ) -> list[T]:
+        self.refresh()
+        lo = np.array([lower.x, lower.y, lower.z])
+        hi = np.array([upper.x, upper.y, upper.z])
+        return [
+            body
+            for body in self.candidates(lo, hi)
+            if isinstance(body, type_)
+            and np.all(self.bounds[body][0] <= hi)
+            and np.all(lo <= self.bounds[body][1])
+        ]
+
+    def query_radius[T: Body3D](
+        self, center: Vector3, radius: float, type_: type[T] = Body3D
+    ) -> list[T]:
+        # Bodies whose bounds come within radius of center
+        self.refresh()
+        c = np.array([center.x, center.y, center.z])
+        found = []
+        for body in self.candidates(c - radius, c + radius):
+            if not isinstance(body, type_):
+                continue
+
+            lower, upper = self.bounds[body]
+            nearest = np.clip(c, lower, upper)
+            if np.sum((nearest - c) ** 2) <= radius * radius:
+                found.append(body)
+
+        return found
@@ -0,0 +1,217 @@
+from math import asin, atan2, cos, sin
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from brijsim.pydot.node_3d import Node3D
+
+IDENTITY = np.array([1.0, 0.0, 0.0, 0.0])
+
+
+def quaternion_multiply(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Hamilton products of (n, 4) arrays of w, x, y, z quaternions
+    aw, ax, ay, az = a.T
+    bw, bx, by, bz = b.T
+    return np.stack(
+        [
+            aw * bw - ax * bx - ay * by - az * bz,
+            aw * bx + ax * bw + ay * bz - az * by,
+            aw * by - ax * bz + ay * bw + az * bx,
+            aw * bz + ax * by - ay * bx + az * bw,
+        ],
+        axis=-1,
+    )
+
+
+def quaternion_rotate(q: np.ndarray, v: np.ndarray) -> np.ndarray:
+    # Rotates (n, 3) vectors by (n, 4) unit quaternions
+    u = q[..., 1:]
+    t = 2.0 * np.cross(u, v)
+    return v + q[..., :1] * t + np.cross(u, t)
+
+
+def quaternion_conjugate(q: np.ndarray) -> np.ndarray:
+    return q * np.array([1.0, -1.0, -1.0, -1.0])
+
+
+def quaternion_from_euler(x: float, y: float, z: float) -> np.ndarray:
+    # Rotation by x radians about the x axis, then y about y, then z about z
+    cx, sx = cos(x / 2), sin(x / 2)
+    cy, sy = cos(y / 2), sin(y / 2)
+    cz, sz = cos(z / 2), sin(z / 2)
+    return np.array(
+        [
+            cx * cy * cz + sx * sy * sz,
+            sx * cy * cz - cx * sy * sz,
+            cx * sy * cz + sx * cy * sz,
+            cx * cy * sz - sx * sy * cz,
+        ]
+    )
+
+
+def euler_from_quaternion(q: np.ndarray) -> tuple[float, float, float]:
+    # Inverse of quaternion_from_euler, with y in [-pi / 2, pi / 2]
+    w, x, y, z = q.tolist()
+    return (
+        atan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y)),
+        asin(min(max(2 * (w * y - z * x), -1.0), 1.0)),
+        atan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z)),
+    )
+
+
+class TransformStore:
+    # Local and world transforms of a hierarchy of Node3Ds in contiguous
+    # arrays. Each slot has a parent slot (-1 for roots) and a dirty flag set
+    # when its local transform changes. World transforms are brought up to
+    # date lazily, in one vectorized pass per level of the hierarchy, for all
+    # the slots under a dirty one.
+    def __init__(self, capacity: int = 16):
+        self.size = 0
+        self.nodes: list[Node3D | None] = []
+        self.parent = np.full(capacity, -1, dtype=np.intp)
+        self.depth = np.zeros(capacity, dtype=np.intp)
+        self.position = np.zeros((capacity, 3))
+        self.rotation = np.tile(IDENTITY, (capacity, 1))
+        self.world_position = np.zeros((capacity, 3))
+        self.world_rotation = np.tile(IDENTITY, (capacity, 1))
+
+        # Bumped for every slot whose world transform a pass recomputes, so
+        # readers can cache what they build from it
+        self.world_version = np.zeros(capacity, dtype=np.int64)
+        self.dirty = np.zeros(capacity, dtype=bool)
+        self.any_dirty = False
+
+        # Bumped whenever slots are released, e.g. when a node moves to
+        # another store, so indexes holding slot numbers into this store know
+        # to look them up again
+        self.release_count = 0
+
+        self.free_slots: list[int] = []
+        self.levels: list[np.ndarray] = []
+        self.levels_changed = True
+
+    def append(
+        self,
+        node: "Node3D",
+        parent: int,
+        position: np.ndarray,
+        rotation: np.ndarray,
+    ) -> int:
+        if self.free_slots:
+            index = self.free_slots.pop()
+            self.nodes[index] = node
+        else:
+            if self.size == len(self.parent):
+                self.reserve(2 * self.size)
+
+            index = self.size
+            self.size += 1
+            self.nodes.append(node)
+
+        self.parent[index] = parent
+        self.depth[index] = self.depth[parent] + 1 if parent >= 0 else 0
+        self.position[index] = position
+        self.rotation[index] = rotation
+        self.world_version[index] += 1
+        self.mark_dirty(index)
+        self.levels_changed = True
+        return index
+
+    def release(self, indices: list[int]):
+        for index in indices:
+            self.nodes[index] = None
+
+        self.parent[indices] = -1
+        self.depth[indices] = 0
+        self.dirty[indices] = False
+        self.free_slots.extend(indices)
+        self.levels_changed = True
+        self.release_count += 1
+
+    def reserve(self, capacity: int):
+        if capacity <= len(self.parent):
+            return
+
+        fields = (
+            "parent",
+            "depth",
+            "position",
+            "rotation",
+            "world_position",
+            "world_rotation",
+            "world_version",
+            "dirty",
+        )
+        for name in fields:
+            old = getattr(self, name)
+            new = np.zeros((capacity, *old.shape[1:]), dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+
+        self.parent[self.size :] = -1
+        self.rotation[self.size :] = IDENTITY
+        self.world_rotation[self.size :] = IDENTITY
+
+    def mark_dirty(self, index: int):
+        self.dirty[index] = True
+        self.any_dirty = True
+
+    def update(self):
+        if not self.any_dirty:
+            return
+
+        if self.levels_changed:
+            live = np.array(
+                [i for i, node in enumerate(self.nodes) if node is not None],
+                dtype=np.intp,
+            )
+            depth = self.depth[live]
+            self.levels = [
+                live[depth == d] for d in range(int(depth.max(initial=-1)) + 1)
+            ]
+            self.levels_changed = False
+
+        # Dirty slots and everything below them are recomputed, a level at a
+        # time so parents are always done before their children
+        changed = self.dirty.copy()
+        for level in self.levels:
+            parents = self.parent[level]
+            has_parent = parents >= 0
+            changed[level] |= has_parent & changed[np.maximum(parents, 0)]
+
+            index = level[changed[level]]
+            if len(index) == 0:
+                continue
+
+            parents = self.parent[index]
+            roots = parents < 0
+            parents = np.maximum(parents, 0)
+            parent_position = np.where(
+                roots[:, None], 0.0, self.world_position[parents]
+            )
+            parent_rotation = np.where(
+                roots[:, None], IDENTITY, self.world_rotation[parents]
+            )
+
+            self.world_position[index] = parent_position + quaternion_rotate(
+                parent_rotation, self.position[index]
+            )
+            self.world_rotation[index] = quaternion_multiply(
+                parent_rotation, self.rotation[index]
+            )
+            self.world_version[index] += 1
+
+        self.dirty[: self.size] = False
+        self.any_dirty = False
+
+    def to_local(self, parent: int, world_position: np.ndarray) -> np.ndarray:
+        # Local position under a parent slot for a world position
+        if parent < 0:
+            return world_position
+
+        self.update()
+        offset = world_position - self.world_position[parent]
+        return quaternion_rotate(
+            quaternion_conjugate(self.world_rotation[parent]), offset
+        )
@@ -1,5 +1,4 @@
 import asyncio
-import threading
 
 import websockets
 from loguru import logger
@@ -12,7 +11,13 @@ from brijsim.universe import Region
 from brijsim.universe.universe import Universe
 
 from . import server_ws
-from .pydot import SceneTree
+from .pydot import MainLoop, SceneTree
+
+
+@app.on_startup
+async def start_simulation():
+    # Runs on the same event loop as the websocket handlers
+    main_loop.start()
 
 
 @app.on_startup
@@ -23,9 +28,14 @@ async def start_websocket_server():
         await server.serve_forever()
 
 
+# Devices tick at 10 Hz, and flows and motion are stepped at 50 Hz within
+# each tick
+TICK_DT = 0.1
+PHYSICS_DT: float | None = 0.02
+
 ship = ShipLoader().load("assets/ships/demo_ship.yaml")
 
-tree = SceneTree()
+tree = SceneTree(physics_dt=PHYSICS_DT)
 universe = Universe("Universe")
 region1 = Region("Region 1")
 region2 = Region("Region 2")
@@ -34,11 +44,11 @@ universe.add_region(region1)
 universe.add_region(region2)
 region1.add_child(ship)
 
+main_loop = MainLoop(tree, dt=TICK_DT)
+
 # r1w = region1.add_wormhole()
 # r2w = region2.add_wormhole()
 
-region1.transform.printTree()
-
 
 @ui.page("/")
 def root():
@@ -55,6 +65,16 @@ def root():
             dark, "value", lambda x: "dark" if x else "light"
         )
 
+    loop_stats = ui.label()
+    ui.timer(
+        1.0,
+        lambda: loop_stats.set_text(
+            f"Tick {main_loop.stats.tick_duration * 1000:.1f} ms, "
+            f"lag {main_loop.stats.lag * 1000:.0f} ms, "
+            f"{main_loop.stats.skipped_steps} skipped steps"
+        ),
+    )
+
     ui.label("Index")
 
     devices = [device for room in ship.rooms for device in room.devices] + ship.devices
@@ -74,15 +94,8 @@ def root():
                     ui.item(node)
 
 
-class RepeatTimer(threading.Timer):
-    def run(self):
-        while not self.finished.wait(self.interval):
-            self.function(*self.args, **self.kwargs)
-
-
 def main(reload=False):
     logger.info(f"Starting nicegui, reload={reload}")
-    RepeatTimer(0.1, lambda: tree.process(0.1)).start()
     ui.run(reload=reload, uvicorn_reload_includes="*.py,*.yaml")
 
 
@@ -9,6 +9,7 @@ from websockets import ServerConnection
 
 from brijsim.devices.device import Device
 from brijsim.pydot.scene_tree import SceneTree
+from brijsim.universe.region_workers import RegionWorkers
 
 connections: set[ServerConnection] = set()
 connections_updated = Event()
@@ -19,19 +20,19 @@ def device_details(device: Device) -> dict:
     return device.panel.to_dict()
 
 
-async def state_sender(websocket, tree: SceneTree):
+async def state_sender(
+    websocket, tree: SceneTree, workers: RegionWorkers | None = None
+):
     while True:
-        devices = tree.find_nodes_by_type(Device)
+        # Regions stepped in worker processes report their own devices
+        if workers is None:
+            devices = tree.find_nodes_by_type(Device)
+            data = [device_details(device) for device in devices]
+        else:
+            data = workers.device_details
 
         try:
-            await websocket.send(
-                json.dumps(
-                    {
-                        "type": "devices",
-                        "data": [device_details(device) for device in devices],
-                    }
-                )
-            )
+            await websocket.send(json.dumps({"type": "devices", "data": data}))
             await asyncio.sleep(0.025)
         except websockets.ConnectionClosed:
             break
@@ -40,8 +41,10 @@ async def state_sender(websocket, tree: SceneTree):
             break
 
 
-async def handler(websocket: ServerConnection, tree: SceneTree):
-    sender_task = asyncio.create_task(state_sender(websocket, tree))
+async def handler(
+    websocket: ServerConnection, tree: SceneTree, workers: RegionWorkers | None = None
+):
+    sender_task = asyncio.create_task(state_sender(websocket, tree, workers))
 
     try:
         connections.add(websocket)
@@ -56,6 +59,10 @@ async def handler(websocket: ServerConnection, tree: SceneTree):
             if message["type"] == "device-action":
                 device_uuid = message["data"]["device_uuid"]
                 action = message["data"]["action"]
+                if workers is not None:
+                    workers.queue_action(device_uuid, action)
+                    continue
+
                 device = tree.node_uuid_map[device_uuid]
                 device.actions[action](device)
 
@@ -11,6 +11,17 @@ class Room(Body3D):
             for port_name, port in child.flow_ports.items():
                 self.parent.flow_model.add_port(f"{child.name}:{port_name}", port)
 
+            self.parent.add_body(child)
+
+    def remove_child(self, child: Node):
+        super().remove_child(child)
+
+        if isinstance(child, Device):
+            for port_name in child.flow_ports:
+                self.parent.flow_model.remove_port(f"{child.name}:{port_name}")
+
+            self.parent.remove_body(child)
+
     @property
     def devices(self) -> list[Device]:
         return [child for child in self.children if isinstance(child, Device)]
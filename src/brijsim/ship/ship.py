@@ -1,22 +1,71 @@
+from math import inf
+
 from brijsim.devices.device import Device
 from brijsim.flow_sim import FlowModel
 from brijsim.ship.room import Room
 from brijsim.universe.region import Region
 
-from ..pydot import Body3D, Node
+from ..pydot import Body3D, Node, SpatialGrid, Vector3
+
+
+def devices_in(node: Node) -> list[Device]:
+    # Devices in a subtree, the node itself included, e.g. a room's
+    devices = [node] if isinstance(node, Device) else []
+    for child in node.children:
+        devices += devices_in(child)
+    return devices
 
 
 class Ship(Body3D):
     def __init__(self, name: str):
         self.flow_model = FlowModel()
+        # Rooms and devices, including the devices inside rooms
+        self.spatial_index = SpatialGrid(cell_size=4.0)
         super().__init__(name)
 
     def add_child(self, child: Node):
         super().add_child(child)
 
-        if isinstance(child, Device):
-            for port_name, port in child.flow_ports.items():
-                self.flow_model.add_port(f"{child.name}:{port_name}", port)
+        for device in devices_in(child):
+            for port_name, port in device.flow_ports.items():
+                self.flow_model.add_port(f"{device.name}:{port_name}", port)
+
+        # A ship is as heavy as its rooms
+        if isinstance(child, Room):
+            self.mass += child.mass
+
+        if isinstance(child, Room | Device):
+            self.add_body(child)
+            for device in child.get_children_by_type(Device):
+                self.add_body(device)
+
+    def remove_child(self, child: Node):
+        super().remove_child(child)
+
+        for device in devices_in(child):
+            for port_name in device.flow_ports:
+                self.flow_model.remove_port(f"{device.name}:{port_name}")
+
+        if isinstance(child, Room):
+            self.mass -= child.mass
+
+        if isinstance(child, Room | Device):
+            self.remove_body(child)
+            for device in child.get_children_by_type(Device):
+                self.remove_body(device)
+
+    def add_body(self, body: Body3D):
+        self.spatial_index.insert(body)
+        if self.region is not None:
+            self.region.spatial_index.insert(body)
+
+    def remove_body(self, body: Body3D):
+        self.spatial_index.remove(body)
+        if self.region is not None:
+            self.region.spatial_index.remove(body)
+
+    def rooms_at(self, point: Vector3) -> list[Room]:
+        return self.spatial_index.query_point(point, Room)
 
     @property
     def rooms(self) -> list[Room]:
@@ -26,11 +75,17 @@ class Ship(Body3D):
     def devices(self) -> list[Device]:
         return self.get_children_by_type(Device)
 
-    def link_ports(self, port1_id: str, port2_id: str):
-        self.flow_model.link_ports(port1_id, port2_id)
+    def link_ports(self, port1_id: str, port2_id: str, capacity: float = inf):
+        self.flow_model.link_ports(port1_id, port2_id, capacity)
+
+    def unlink_ports(self, port1_id: str, port2_id: str):
+        self.flow_model.unlink_ports(port1_id, port2_id)
 
-    def process(self, delta: float):
-        self.flow_model.step(delta)
+    def physics_process(self, delta: float):
+        # A region steps all of its ships' motion and flow models together
+        if self.region is None:
+            self.rigid_bodies.integrate(delta)
+            self.flow_model.step(delta)
 
     def find_room_by_name(self, name: str) -> Room:
         return [room for room in self.rooms if room.name == name][0]
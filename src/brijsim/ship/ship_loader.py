@@ -61,7 +61,8 @@ class ShipLoader:
                 if device:
                     room.add_child(device)
 
-        for port1, port2 in data["port_links"]:
-            ship.link_ports(port1, port2)
+        # Links are [port1, port2] or [port1, port2, capacity]
+        for port1, port2, *capacity in data["port_links"]:
+            ship.link_ports(port1, port2, *capacity)
 
         return ship
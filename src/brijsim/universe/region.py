@@ -1,5 +1,119 @@
-from brijsim.pydot import Node3D
+from brijsim.devices.device import Device
+from brijsim.flow_sim import FlowModel, FlowStore
+from brijsim.pydot import (
+    Body3D,
+    BroadPhase,
+    Node,
+    Node3D,
+    RigidBodyStore,
+    Signal,
+    SpatialGrid,
+)
 
 
 class Region(Node3D):
-    pass
+    def __init__(self, name: str):
+        super().__init__(name)
+        # Every ship's flow ports in the region share one store, so all their
+        # flow models are solved in one vectorized pass per tick
+        self.flow_store = FlowStore()
+        self.flow_models: list[FlowModel] = []
+        # Every ship's rooms and devices, over cells sized for ship spacing
+        self.spatial_index = SpatialGrid(cell_size=64.0)
+        # Motion of the bodies directly in the region, i.e. ships
+        self.rigid_bodies = RigidBodyStore()
+
+        # Pairs of those bodies within docking range of each other, or
+        # overlapping, as they change from tick to tick
+        self.broad_phase = BroadPhase(margin=50.0)
+        self.bodies_near: Signal[Body3D, Body3D] = Signal()
+        self.bodies_apart: Signal[Body3D, Body3D] = Signal()
+        self.bodies_collided: Signal[Body3D, Body3D] = Signal()
+        self.bodies_separated: Signal[Body3D, Body3D] = Signal()
+
+        # Bodies handed off to other regions by name, collected by whatever
+        # owns the regions, i.e. the universe or the region workers
+        self.departures: list[tuple[Node, str]] = []
+
+    def add_child(self, child: Node):
+        super().add_child(child)
+
+        if isinstance(child, Body3D):
+            child.bind_rigid_bodies(self.rigid_bodies)
+            self.broad_phase.insert(child)
+
+        flow_model = getattr(child, "flow_model", None)
+        if isinstance(flow_model, FlowModel) and flow_model not in self.flow_models:
+            flow_model.bind(self.flow_store)
+            self.flow_models.append(flow_model)
+
+        spatial_index = getattr(child, "spatial_index", None)
+        if isinstance(spatial_index, SpatialGrid):
+            for body in spatial_index.bodies:
+                self.spatial_index.insert(body)
+
+    def remove_child(self, child: Node):
+        super().remove_child(child)
+
+        if isinstance(child, Body3D):
+            child.bind_rigid_bodies(RigidBodyStore(1))
+            self.broad_phase.remove(child)
+
+        flow_model = getattr(child, "flow_model", None)
+        if flow_model in self.flow_models:
+            flow_model.bind(FlowStore())
+            self.flow_models.remove(flow_model)
+
+        spatial_index = getattr(child, "spatial_index", None)
+        if isinstance(spatial_index, SpatialGrid):
+            for body in spatial_index.bodies:
+                self.spatial_index.remove(body)
+
+    def physics_process(self, delta: float):
+        self.rigid_bodies.integrate(delta)
+
+        near, apart, collided, separated = self.broad_phase.update()
+        for body1, body2 in near:
+            self.bodies_near.emit(body1, body2)
+        for body1, body2 in apart:
+            self.bodies_apart.emit(body1, body2)
+        for body1, body2 in collided:
+            self.bodies_collided.emit(body1, body2)
+        for body1, body2 in separated:
+            self.bodies_separated.emit(body1, body2)
+
+        self.flow_store.solve(delta)
+
+        for flow_model in self.flow_models:
+            flow_model.limit()
+
+        self.flow_store.notify_watchers()
+
+    def hand_off(self, body: Node, destination: str):
+        # Takes a body out of this region, to arrive in the destination on
+        # the next tick. It travels detached, so it can be pickled.
+        self.remove_child(body)
+        self.departures.append((body, destination))
+
+    def state(self) -> dict:
+        # Snapshot of what the region's views need, in plain data
+        bodies = self.get_children_by_type(Body3D)
+        return {
+            "name": self.name,
+            "bodies": [
+                {
+                    "uuid": body.uuid,
+                    "name": body.name,
+                    "position": body.global_position_array.tolist(),
+                    "velocity": body.rigid_bodies.velocity[
+                        body.rigid_body_index
+                    ].tolist(),
+                }
+                for body in bodies
+            ],
+            "devices": [
+                body.panel.to_dict()
+                for body in self.spatial_index.bodies
+                if isinstance(body, Device)
+            ],
+        }
@@ -0,0 +1,147 @@
+import multiprocessing
+import pickle
+from multiprocessing.connection import Connection
+
+from brijsim.pydot import Node, SceneTree
+from brijsim.universe.region import Region
+
+
+def run_regions(
+    connection: Connection, regions: list[Region], physics_dt: float | None
+):
+    # Worker process loop: steps its own scene tree of regions once per tick
+    # message and replies with the bodies they handed off and their states
+    tree = SceneTree(physics_dt)
+    regions_by_name = {region.name: region for region in regions}
+    for region in regions:
+        tree.add_child(region)
+
+    while True:
+        match connection.recv():
+            case ("tick", delta, arrivals, actions):
+                for destination, body in arrivals:
+                    regions_by_name[destination].add_child(body)
+
+                for device_uuid, action in actions:
+                    device = tree.node_uuid_map.get(device_uuid)
+                    if device is not None:
+                        device.actions[action](device)
+
+                tree.process(delta)
+
+                departures: list[tuple[str, Node]] = []
+                for region in regions:
+                    departures += [(dest, body) for body, dest in region.departures]
+                    region.departures = []
+
+                states = {region.name: region.state() for region in regions}
+                connection.send((departures, states))
+            case ("stop",):
+                for region in regions:
+                    tree.root.remove_child(region)
+                connection.send(regions)
+                return
+
+
+def check_region(region: Region):
+    # A region is moved into a worker process whole, so it has to stand on
+    # its own and survive pickling
+    if region.parent is not None or region.scene_tree is not None:
+        raise ValueError(
+            f"Region {region.name!r} must be detached from its tree before it "
+            "is given to a worker"
+        )
+
+    try:
+        pickle.dumps(region)
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        raise TypeError(
+            f"Region {region.name!r} can't be sent to a worker process: {e}"
+        ) from e
+
+
+class RegionWorkers:
+    # Steps groups of regions in worker processes, in lockstep: each tick is
+    # sent to every worker and waited for before the next, which acts as the
+    # barrier. Bodies handed off between regions are carried to the worker
+    # owning the destination and arrive on the next tick, and each region's
+    # state is kept for views. Has the same process() as a SceneTree, so a
+    # MainLoop can drive it.
+    def __init__(
+        self,
+        groups: list[list[Region]],
+        physics_dt: float | None = None,
+        start_method: str = "spawn",
+    ):
+        for regions in groups:
+            for region in regions:
+                check_region(region)
+
+        context = multiprocessing.get_context(start_method)
+        self.connections: list[Connection] = []
+        self.processes: list[multiprocessing.process.BaseProcess] = []
+        self.owners: dict[str, int] = {}
+
+        for worker, regions in enumerate(groups):
+            connection, worker_connection = context.Pipe()
+            process = context.Process(
+                target=run_regions,
+                args=(worker_connection, regions, physics_dt),
+                name=f"regions-{worker}",
+                daemon=True,
+            )
+            self.connections.append(connection)
+            self.processes.append(process)
+            for region in regions:
+                self.owners[region.name] = worker
+
+        self.arrivals: list[list[tuple[str, Node]]] = [[] for _ in groups]
+        self.actions: list[tuple[str, str]] = []
+        self.states: dict[str, dict] = {}
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+
+    def process(self, delta: float):
+        actions, self.actions = self.actions, []
+        for worker, connection in enumerate(self.connections):
+            connection.send(("tick", delta, self.arrivals[worker], actions))
+            self.arrivals[worker] = []
+
+        for connection in self.connections:
+            departures, states = connection.recv()
+            self.states.update(states)
+            for destination, body in departures:
+                if destination not in self.owners:
+                    raise ValueError(
+                        f"{body.name} was handed off to unknown region {destination!r}"
+                    )
+                self.arrivals[self.owners[destination]].append((destination, body))
+
+    def queue_action(self, device_uuid: str, action: str):
+        # Runs a device action in whichever worker has the device, at the
+        # start of the next tick
+        self.actions.append((device_uuid, action))
+
+    @property
+    def device_details(self) -> list[dict]:
+        return [device for state in self.states.values() for device in state["devices"]]
+
+    def stop(self) -> list[Region]:
+        # Ends the workers and returns their regions as they were last
+        # stepped, with any bodies still in transit added to their destination
+        regions: list[Region] = []
+        for connection in self.connections:
+            connection.send(("stop",))
+            regions += connection.recv()
+
+        for process in self.processes:
+            process.join()
+
+        regions_by_name = {region.name: region for region in regions}
+        for arrivals in self.arrivals:
+            for destination, body in arrivals:
+                regions_by_name[destination].add_child(body)
+
+        return regions
@@ -0,0 +1,59 @@
+from math import inf
+
+import networkx as nx
+from networkx.classes.digraph import DiGraph
+
+
+class RouteCache:
+    # Shortest routes over a weighted DiGraph, one Dijkstra tree per source,
+    # computed the first time a route from that source is asked for and kept
+    # until an edge change can affect it. An added or shortened edge u->v
+    # only matters to sources it gives a shorter way to v, and a removed or
+    # lengthened one only to sources whose tree reaches v through it.
+    def __init__(self, graph: DiGraph):
+        self.graph = graph
+        self.distances: dict[str, dict[str, float]] = {}
+        self.paths: dict[str, dict[str, list[str]]] = {}
+        self.searches = 0
+
+    def tree(self, source: str) -> tuple[dict[str, float], dict[str, list[str]]]:
+        if source not in self.paths:
+            distances, paths = nx.single_source_dijkstra(self.graph, source)
+            self.distances[source] = distances
+            self.paths[source] = paths
+            self.searches += 1
+
+        return self.distances[source], self.paths[source]
+
+    def precompute(self):
+        for source in self.graph:
+            self.tree(source)
+
+    def route(self, source: str, destination: str) -> list[str] | None:
+        # Regions from source to destination inclusive, or None if there's
+        # no way there
+        return self.tree(source)[1].get(destination)
+
+    def distance(self, source: str, destination: str) -> float:
+        return self.tree(source)[0].get(destination, inf)
+
+    def edge_added(self, u: str, v: str, weight: float):
+        # Also for an edge that got shorter
+        for source, distances in list(self.distances.items()):
+            if distances.get(u, inf) + weight < distances.get(v, inf):
+                self.invalidate(source)
+
+    def edge_removed(self, u: str, v: str):
+        # Also for an edge that got longer, before it's added back
+        for source, paths in list(self.paths.items()):
+            path = paths.get(v)
+            if path is not None and len(path) >= 2 and path[-2] == u:
+                self.invalidate(source)
+
+    def invalidate(self, source: str):
+        self.distances.pop(source, None)
+        self.paths.pop(source, None)
+
+    def clear(self):
+        self.distances = {}
+        self.paths = {}
@@ -1,18 +1,99 @@
+from itertools import pairwise
+from math import inf
+
 from networkx.classes.digraph import DiGraph
 
 from brijsim.pydot import Node, Node3D
 from brijsim.universe.region import Region
+from brijsim.universe.routing import RouteCache
 
 
 class Universe(Node):
     def __init__(self, name):
         super().__init__(name)
+        # Regions by name, with an edge for each direction there's a wormhole
+        # in, weighted by the shortest of them
         self.network = DiGraph()
+        self.routes = RouteCache(self.network)
+        self.in_transit: list[tuple[Node, str]] = []
 
     def add_region(self, region: Region):
         super().add_child(region)
         self.network.add_node(region.name, region=region)
 
+    def add_wormhole(
+        self,
+        wormhole: "Wormhole",
+        source: Region,
+        destination: Region,
+        length: float = 1.0,
+    ):
+        super().add_child(wormhole)
+        source.add_child(wormhole.entrance)
+        destination.add_child(wormhole.exit)
+        wormhole.source = source.name
+        wormhole.destination = destination.name
+        wormhole.length = length
+
+        u, v = source.name, destination.name
+        if not self.network.has_edge(u, v):
+            self.network.add_edge(u, v, weight=inf, wormholes={})
+
+        edge = self.network.edges[u, v]
+        edge["wormholes"][wormhole] = length
+        if length < edge["weight"]:
+            edge["weight"] = length
+            self.routes.edge_added(u, v, length)
+
+    def remove_wormhole(self, wormhole: "Wormhole"):
+        u, v = wormhole.source, wormhole.destination
+        edge = self.network.edges[u, v]
+        del edge["wormholes"][wormhole]
+        wormhole.entrance.parent.remove_child(wormhole.entrance)
+        wormhole.exit.parent.remove_child(wormhole.exit)
+        super().remove_child(wormhole)
+
+        if not edge["wormholes"]:
+            self.routes.edge_removed(u, v)
+            self.network.remove_edge(u, v)
+        elif (weight := min(edge["wormholes"].values())) > edge["weight"]:
+            self.routes.edge_removed(u, v)
+            edge["weight"] = weight
+
+    def route(self, source: str, destination: str) -> list[str] | None:
+        # Names of the regions along the shortest way, both ends included
+        return self.routes.route(source, destination)
+
+    def plan_jumps(self, source: str, destination: str) -> list["Wormhole"] | None:
+        # The shortest wormhole to take out of each region along the route
+        route = self.route(source, destination)
+        if route is None:
+            return None
+
+        jumps = []
+        for u, v in pairwise(route):
+            wormholes = self.network.edges[u, v]["wormholes"]
+            jumps.append(min(wormholes, key=wormholes.get))
+        return jumps
+
+    def process(self, delta: float):
+        # Bodies handed off by a region arrive in their destination on the
+        # tick after they leave, as they do between region workers
+        regions = {region.name: region for region in self.get_children_by_type(Region)}
+        for body, destination in self.in_transit:
+            regions[destination].add_child(body)
+
+        self.in_transit = []
+        for region in regions.values():
+            for body, destination in region.departures:
+                if destination not in regions:
+                    raise ValueError(
+                        f"{region.name} handed {body.name} off to unknown region "
+                        f"{destination!r}"
+                    )
+                self.in_transit.append((body, destination))
+            region.departures = []
+
 
 class Wormhole(Node):
     def __init__(self, name):
@@ -20,6 +101,11 @@ class Wormhole(Node):
         self.entrance = WormholeEntrance(f"{name}-entrance")
         self.exit = WormholeExit(f"{name}-exit")
 
+        # Set once the universe links it between two regions
+        self.source = ""
+        self.destination = ""
+        self.length = 1.0
+
 
 class WormholeEntrance(Node3D):
     pass
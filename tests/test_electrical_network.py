@@ -1,7 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
+import pytest
 from pytest import approx
 
-from brijsim.electrical_sim import ElectricalNetwork, Node, Resistor
+from brijsim.electrical_sim import (
+    ElectricalNetwork,
+    Integration,
+    Node,
+    NonlinearComponent,
+    Resistor,
+)
 
 
 def test_case_1():
@@ -91,3 +100,381 @@ def test_node_spanning_resistors():
 
     assert {c.name for c in n2.spanning_components(n3)} == {"R23A", "R23B"}
     assert {c.name for c in n3.spanning_components(n2)} == {"R23A", "R23B"}
+
+
+def test_parallel_resistors_are_stamped_in_G():
+    sim = ElectricalNetwork()
+    sim.add_resistor("R1", 1, 2, 10)
+    sim.add_resistor("R2", 1, 2, 10)
+    sim.add_resistor("R3", 2, 0, 5)
+
+    np.testing.assert_allclose(sim.build_G(), np.array([[0.2, -0.2], [-0.2, 0.4]]))
+
+
+def test_build_A_is_sparse_for_a_ladder():
+    # A long resistor ladder only has a handful of entries per row
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, 10)
+    rungs = 2_000
+    for i in range(1, rungs):
+        sim.add_resistor(f"RS{i}", i, i + 1, 1)
+        sim.add_resistor(f"RP{i}", i + 1, 0, 1_000)
+
+    A = sim.build_A()
+    assert A.shape == (rungs + 1, rungs + 1)
+    assert A.nnz < 5 * (rungs + 1)
+
+    sim.run()
+    assert sim.nodes[1].voltage == approx(10)
+    assert 0 < sim.nodes[rungs].voltage < sim.nodes[2].voltage
+
+
+def test_source_changes_reuse_factorization():
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, 10)
+    sim.add_ind_current_source("I1", 2, 0, 0)
+    sim.add_resistor("R1", 1, 2, 10)
+    sim.add_resistor("R2", 2, 0, 10)
+
+    sim.run()
+    assert sim.nodes[2].voltage == approx(5)
+
+    sim.ind_voltage_sources[0].voltage = 20
+    sim.ind_current_sources[0].current = 1
+    sim.run()
+    assert sim.nodes[2].voltage == approx(15)
+    assert sim.factorization_count == 1
+
+    sim.resistors["R2"].resistance = 30
+    sim.run()
+    assert sim.nodes[2].voltage == approx(22.5)
+    assert sim.factorization_count == 2
+
+    sim.add_resistor("R3", 2, 0, 30)
+    sim.run()
+    assert sim.nodes[2].voltage == approx(18)
+    assert sim.factorization_count == 3
+
+
+def test_solve_batch_matches_run():
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 2, 1, 32.0)
+    sim.add_ind_voltage_source("V2", 3, 0, 20.0)
+    sim.add_ind_current_source("I1", 1, 0, 0.0)
+    sim.add_resistor("R1", 1, 0, 2.0)
+    sim.add_resistor("R2", 2, 3, 4.0)
+    sim.add_resistor("R3", 2, 0, 8.0)
+
+    e = np.array([[32.0, 20.0], [10.0, 5.0], [0.0, 1.0]])
+    i = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [2.0, 0.0, 0.0]])
+    voltages, currents = sim.solve_batch(i, e)
+
+    assert voltages.shape == (3, 4)
+    assert currents.shape == (3, 2)
+
+    for k in range(3):
+        sim.ind_voltage_sources[0].voltage, sim.ind_voltage_sources[1].voltage = e[k]
+        sim.ind_current_sources[0].current = i[k, 0]
+        sim.run()
+        np.testing.assert_allclose(
+            voltages[k, :3], [node.voltage for node in sim.nodes[:3]], atol=1e-12
+        )
+        np.testing.assert_allclose(
+            currents[k], [s.current for s in sim.ind_voltage_sources], atol=1e-12
+        )
+    assert sim.factorization_count == 1
+
+
+def test_solve_batch_broadcasts_present_sources():
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, 10)
+    sim.add_resistor("R1", 1, 2, 10)
+    sim.add_resistor("R2", 2, 0, 10)
+
+    voltages, currents = sim.solve_batch(e=np.array([[10.0], [20.0]]))
+
+    np.testing.assert_allclose(voltages[:, 2], [5, 10])
+    np.testing.assert_allclose(currents[:, 0], [-0.5, -1.0])
+
+
+def test_rc_charging_transient():
+    # 10 V through 1 kOhm into 1 mF, so tau = 1 s
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, 10)
+    sim.add_resistor("R1", 1, 2, 1_000)
+    sim.add_capacitor("C1", 2, 0, 1e-3)
+
+    for _ in range(100):
+        sim.step(0.01)
+
+    # The source switches on at t=0 with no capacitor current, so trapezoidal
+    # integration lags by about half a step
+    assert sim.nodes[2].voltage == approx(10 * (1 - np.exp(-0.995)), rel=1e-4)
+    assert sim.capacitors["C1"].current == approx(0.01 * np.exp(-0.995), rel=1e-3)
+    assert sim.factorization_count == 1
+
+    # At DC, the capacitor is open and fully charged
+    sim.run()
+    assert sim.nodes[2].voltage == approx(10)
+    assert sim.capacitors["C1"].current == 0
+
+
+def test_rl_transient_backward_euler():
+    # 10 V through 10 Ohm into 1 H, so tau = 0.1 s
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, 10)
+    sim.add_resistor("R1", 1, 2, 10)
+    sim.add_inductor("L1", 2, 0, 1)
+
+    for _ in range(1_000):
+        sim.step(0.0001, Integration.BACKWARD_EULER)
+
+    assert sim.inductors["L1"].current == approx(1 - np.exp(-1), rel=1e-3)
+    assert sim.inductors["L1"].voltage == approx(10 * np.exp(-1), rel=1e-3)
+    assert sim.factorization_count == 1
+
+    # At DC, the inductor is a short
+    sim.run()
+    assert sim.nodes[2].voltage == approx(0)
+    assert sim.inductors["L1"].current == approx(1)
+    assert sim.ind_voltage_sources[0].current == approx(-1)
+
+
+def test_switches_are_low_rank_updates():
+    #   1   R1    2   S1    3
+    #   |--[10]---|---/ ----|
+    #   V1       R2        R3
+    #   |        [10]      [10]
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, 10)
+    sim.add_resistor("R1", 1, 2, 10)
+    sim.add_resistor("R2", 2, 0, 10)
+    sim.add_resistor("R3", 3, 0, 10)
+    sim.add_switch("S1", 2, 3, 1e-3, closed=False)
+
+    sim.run()
+    assert sim.nodes[2].voltage == approx(5)
+    assert sim.nodes[3].voltage == approx(0)
+
+    sim.switches["S1"].closed = True
+    sim.run()
+    assert sim.nodes[2].voltage == approx(10 / 3, rel=1e-3)
+    assert sim.nodes[3].voltage == approx(10 / 3, rel=1e-3)
+
+    sim.switches["S1"].resistance = 10
+    sim.run()
+    assert sim.nodes[2].voltage == approx(4)
+    assert sim.nodes[3].voltage == approx(2)
+
+    sim.switches["S1"].closed = False
+    sim.run()
+    assert sim.nodes[2].voltage == approx(5)
+    assert sim.factorization_count == 1
+
+    # Changing a regular component still refactors
+    sim.resistors["R2"].resistance = 30
+    sim.run()
+    assert sim.nodes[2].voltage == approx(7.5)
+    assert sim.factorization_count == 2
+
+
+def test_many_switch_changes_refactor():
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, 10)
+    for i in range(20):
+        sim.add_switch(f"S{i}", 1, 2, 100)
+    sim.add_resistor("R1", 2, 0, 5)
+    sim.max_low_rank_updates = 4
+
+    sim.run()
+    assert sim.nodes[2].voltage == approx(5)
+
+    for i in range(3):
+        sim.switches[f"S{i}"].closed = False
+    sim.run()
+    assert sim.nodes[2].voltage == approx(10 * 5 / (100 / 17 + 5))
+    assert sim.factorization_count == 1
+
+    for i in range(10):
+        sim.switches[f"S{i}"].closed = False
+    sim.run()
+    assert sim.nodes[2].voltage == approx(10 * 5 / (100 / 10 + 5))
+    assert sim.factorization_count == 2
+
+
+def build_two_bus_network() -> ElectricalNetwork:
+    # Two generator buses that only share ground
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, 10)
+    sim.add_resistor("R1", 1, 2, 10)
+    sim.add_resistor("R2", 2, 0, 10)
+    sim.add_ind_voltage_source("V2", 3, 0, 12)
+    sim.add_resistor("R3", 3, 4, 10)
+    sim.add_resistor("R4", 4, 0, 20)
+    sim.add_switch("S1", 2, 4, 1e-3, closed=False)
+    return sim
+
+
+def test_islands_are_solved_independently():
+    sim = build_two_bus_network()
+
+    assert sorted(sim.islands()) == [[1, 2], [3, 4]]
+
+    sim.run()
+    assert sim.nodes[2].voltage == approx(5)
+    assert sim.nodes[4].voltage == approx(8)
+    assert sim.ind_voltage_sources[1].current == approx(-0.4)
+
+    # Tying the buses together is a low-rank update across islands
+    sim.switches["S1"].closed = True
+    sim.run()
+    assert sim.nodes[2].voltage == approx(sim.nodes[4].voltage, rel=1e-3)
+    assert sim.factorization_count == 1
+
+
+def test_islands_on_executor():
+    with ThreadPoolExecutor(2) as executor:
+        sim = build_two_bus_network()
+        sim.executor = executor
+        sim.run()
+
+    assert sim.nodes[2].voltage == approx(5)
+    assert sim.nodes[4].voltage == approx(8)
+
+
+def test_diode_forward_bias():
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, 5)
+    sim.add_resistor("R1", 1, 2, 1_000)
+    sim.add_diode("D1", 2, 0)
+
+    sim.run()
+
+    diode = sim.diodes["D1"]
+    assert 0.55 < diode.voltage < 0.7
+    assert diode.current == approx((5 - diode.voltage) / 1_000)
+    assert diode.current == approx(
+        1e-14 * (np.exp(diode.voltage / 0.025852) - 1), rel=1e-6
+    )
+
+    # Already at the solution, so the next tick reuses everything
+    count = sim.factorization_count
+    sim.run()
+    assert sim.newton_iterations == 0
+    assert sim.factorization_count == count
+
+    # A small source change converges quickly without refactoring
+    sim.ind_voltage_sources[0].voltage = 5.1
+    sim.run()
+    assert sim.newton_iterations <= 3
+    assert sim.diodes["D1"].current == approx((5.1 - diode.voltage) / 1_000)
+
+
+def test_diode_added_to_live_circuit():
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, 5)
+    sim.add_resistor("R1", 1, 2, 1_000)
+    sim.add_resistor("R2", 2, 0, 1_000_000)
+    sim.run()
+    assert sim.nodes[2].voltage == approx(5, rel=1e-2)
+
+    # The new diode starts from 0 V, not the 5 V already across it
+    sim.add_diode("D1", 2, 0)
+    sim.run()
+
+    diode = sim.diodes["D1"]
+    assert 0.6 < diode.voltage < 0.75
+    assert diode.current == approx((5 - diode.voltage) / 1_000, rel=1e-2)
+
+
+def test_diode_reverse_bias():
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, -5)
+    sim.add_resistor("R1", 1, 2, 1_000)
+    sim.add_diode("D1", 2, 0)
+
+    sim.run()
+
+    assert sim.nodes[2].voltage == approx(-5)
+    assert sim.diodes["D1"].current == approx(-1e-14)
+
+
+def test_nonlinear_components_must_evaluate():
+    class Incomplete(NonlinearComponent):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete("X1")
+
+
+def test_constant_power_load():
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, 100)
+    sim.add_resistor("R1", 1, 2, 1)
+    sim.add_constant_power_load("P1", 2, 0, 500)
+    sim.nodes[2].voltage = 100  # Start near the high-voltage solution
+
+    sim.run()
+
+    load = sim.constant_power_loads["P1"]
+    assert load.voltage * load.current == approx(500)
+    # (100 - v) / 1 = 500 / v
+    assert load.voltage == approx((100 + np.sqrt(100**2 - 4 * 500)) / 2)
+
+
+def test_current_limited_source():
+    sim = ElectricalNetwork()
+    sim.add_current_limited_source("G1", 1, 0, 10, 0.1, 2)
+    sim.add_resistor("R1", 1, 0, 100)
+
+    sim.run()
+    source = sim.current_limited_sources["G1"]
+    assert sim.nodes[1].voltage == approx(10 * 100 / 100.1)
+    assert source.current == approx(-10 / 100.1)
+
+    sim.resistors["R1"].resistance = 1
+    sim.run()
+    assert source.current == approx(-2)
+    assert sim.nodes[1].voltage == approx(2)
+
+
+def test_ac_sweep_rc_low_pass():
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, 0)
+    sim.ind_voltage_sources[0].ac_magnitude = 1
+    sim.add_resistor("R1", 1, 2, 1_000)
+    sim.add_capacitor("C1", 2, 0, 1e-6)
+
+    corner = 1 / (2 * np.pi * 1_000 * 1e-6)
+    frequencies = np.logspace(0, 5, 200)
+    sweep = sim.ac_sweep(np.concat([[corner], frequencies]))
+
+    assert sweep.magnitude.shape == (201, 3)
+    assert sweep.magnitude[0, 2] == approx(1 / np.sqrt(2))
+    assert sweep.phase[0, 2] == approx(-45)
+
+    expected = 1 / (1 + 2j * np.pi * frequencies * 1e-3)
+    np.testing.assert_allclose(sweep.voltages[1:, 2], expected)
+
+
+def test_ac_sweep_series_rlc_resonance():
+    sim = ElectricalNetwork()
+    sim.add_ind_voltage_source("V1", 1, 0, 0)
+    sim.ind_voltage_sources[0].ac_magnitude = 1
+    sim.add_resistor("R1", 1, 2, 10)
+    sim.add_inductor("L1", 2, 3, 1e-3)
+    sim.add_capacitor("C1", 3, 0, 1e-6)
+
+    resonance = 1 / (2 * np.pi * np.sqrt(1e-3 * 1e-6))
+    frequencies = np.array([resonance / 10, resonance, resonance * 10])
+
+    dense = sim.ac_sweep(frequencies)
+    sparse = sim.ac_sweep(frequencies, max_dense_size=0)
+
+    np.testing.assert_allclose(dense.voltages, sparse.voltages, atol=1e-12)
+    np.testing.assert_allclose(dense.currents, sparse.currents, atol=1e-12)
+
+    # At resonance L and C cancel, so all of V1 is across R1
+    assert abs(dense.currents[1, 0]) == approx(0.1)
+    assert abs(dense.currents[0, 0]) < 0.1
+    assert abs(dense.currents[2, 0]) < 0.1
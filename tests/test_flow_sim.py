@@ -1,8 +1,16 @@
+from math import inf
+
+import networkx as nx
+import numpy as np
 import pytest
 from pytest import approx
 
 from brijsim import FlowModel
-from brijsim.flow_sim import FlowPort
+from brijsim.devices.generator import AuxGenerator
+from brijsim.devices.tanks import FuelTank
+from brijsim.flow_sim import FlowPort, FlowStore
+from brijsim.ship.ship import Ship
+from brijsim.universe.region import Region
 
 
 def test_model_creation():
@@ -71,6 +79,31 @@ def test_discharging_model():
     assert tank.rate == approx(1.0)
 
 
+def test_storage_supply_does_not_depend_on_dt():
+    # A tank can give up all it holds within one step, i.e. qty / dt
+    for dt, steps in ((0.1, 1), (0.02, 5)):
+        model = FlowModel()
+        sink = model.add_port("sink", FlowPort(-5.0, 0.0))
+        tank = model.add_port("tank", FlowPort(0.0, 5.0, qty=1.0))
+        model.link_ports(tank, sink)
+
+        for _ in range(steps):
+            model.step(dt)
+
+        assert sink.rate == approx(-5.0)
+        assert tank.qty == approx(0.5)
+
+    # Holding less than a step's demand, it empties into the sink
+    model = FlowModel()
+    sink = model.add_port("sink", FlowPort(-5.0, 0.0))
+    tank = model.add_port("tank", FlowPort(0.0, 5.0, qty=0.1))
+    model.link_ports(tank, sink)
+
+    model.step(0.1)
+    assert sink.rate == approx(-1.0)
+    assert tank.qty == 0.0
+
+
 def test_full_charging_and_discharging_model():
     model = FlowModel()
     source = model.add_port("source", FlowPort(1.0, 0.0))
@@ -160,3 +193,305 @@ def test_linking_by_reference():
     source = model.add_port("source", FlowPort(1.0, 0.0))
     sink = model.add_port("sink", FlowPort(-1.0, 0.0))
     model.link_ports(source, sink)
+
+
+def test_ports_view_the_model_store():
+    model = FlowModel()
+    port = FlowPort(5.0, 10.0, qty=2.0)
+    assert port.qty == 2.0
+
+    model.add_port("port", port)
+    assert port.store is model.store
+    assert model.store.qty[port.index] == 2.0
+
+    port.rate_capacity = -3.0
+    assert model.store.rate_capacity[port.index] == -3.0
+
+
+def test_vectorized_step_matches_reference_solver():
+    rng = np.random.default_rng(1)
+    model = FlowModel()
+    reference = FlowModel()
+
+    for i in range(300):
+        rate_capacity = rng.choice([0.0, 1.0, -1.0]) * rng.uniform(0, 10)
+        qty_capacity = rng.choice([0.0, rng.uniform(0, 20)])
+        qty = rng.uniform(0, qty_capacity)
+        model.add_port(f"p{i}", FlowPort(rate_capacity, qty_capacity, qty=qty))
+        reference.add_port(f"p{i}", FlowPort(rate_capacity, qty_capacity, qty=qty))
+
+    for a, b in rng.integers(0, 300, size=(200, 2)):
+        model.link_ports(f"p{a}", f"p{b}")
+        reference.link_ports(f"p{a}", f"p{b}")
+
+    for dt in (0.1, 1.0, 5.0):
+        model.step(dt)
+        for nodes in reference.connected_nodes():
+            ports = [reference.graph.nodes[node]["port"] for node in nodes]
+            reference.solve_connected_components(ports, dt)
+
+        for node in model.graph.nodes:
+            port = model.graph.nodes[node]["port"]
+            expected = reference.graph.nodes[node]["port"]
+            assert port.rate == approx(expected.rate)
+            assert port.qty == approx(expected.qty)
+
+
+def test_components_are_tracked_incrementally(monkeypatch):
+    model = FlowModel()
+    for i in range(6):
+        model.add_port(f"p{i}", FlowPort(0.0, 0.0))
+
+    model.link_ports("p0", "p1")
+    model.link_ports("p1", "p2")
+    model.link_ports("p2", "p0")
+    model.link_ports("p3", "p4")
+    model.link_ports("p2", "p3")
+
+    assert sorted(map(sorted, model.connected_nodes())) == [
+        ["p0", "p1", "p2", "p3", "p4"],
+        ["p5"],
+    ]
+
+    # Still connected around the loop
+    model.unlink_ports("p0", "p1")
+    assert len(model.connected_nodes()) == 2
+
+    # Splits off p3 and p4
+    model.unlink_ports("p2", "p3")
+    assert sorted(map(sorted, model.connected_nodes())) == [
+        ["p0", "p1", "p2"],
+        ["p3", "p4"],
+        ["p5"],
+    ]
+    assert model.label("p3") == model.label("p4") != model.label("p0")
+
+    with pytest.raises(KeyError):
+        model.unlink_ports("p0", "p5")
+
+    # Stepping needs no graph traversal
+    monkeypatch.setattr(nx, "connected_components", None)
+    model.step(0.1)
+
+
+def test_unlinking_isolates_flow():
+    model = FlowModel()
+    source = model.add_port("source", FlowPort(1.0, 0.0))
+    valve = model.add_port("valve", FlowPort(0.0, 0.0))
+    tank = model.add_port("tank", FlowPort(0.0, 5.0))
+    model.link_ports(source, valve)
+    model.link_ports(valve, tank)
+
+    model.step(1.0)
+    assert tank.qty == approx(1.0)
+
+    model.unlink_ports(valve, tank)
+    model.step(1.0)
+    assert tank.qty == approx(1.0)
+    assert source.rate == approx(0.0)
+
+    model.link_ports(valve, tank)
+    model.step(1.0)
+    assert tank.qty == approx(2.0)
+
+
+def test_quiescent_components_are_skipped():
+    model = FlowModel()
+    tank = model.add_port("tank", FlowPort(0.0, 5.0, qty=5.0))
+    generator = model.add_port("generator", FlowPort(0.0, 0.0))
+    model.link_ports(tank, generator)
+    source = model.add_port("source", FlowPort(1.0, 0.0))
+    battery = model.add_port("battery", FlowPort(0.0, 2.0))
+    model.link_ports(source, battery)
+
+    model.step(0.5)
+    assert (model.solved_components, model.skipped_components) == (2, 0)
+
+    # The idle tank is quiescent, the battery keeps charging
+    model.step(0.5)
+    assert (model.solved_components, model.skipped_components) == (1, 1)
+
+    for i in range(4):
+        model.step(0.5)
+    assert battery.qty == approx(2.0)
+
+    # Both full or idle
+    model.step(0.5)
+    model.step(0.5)
+    assert (model.solved_components, model.skipped_components) == (0, 2)
+    assert source.rate == approx(0.0)
+
+    # Setting a capacity to the value it already has changes nothing
+    generator.rate_capacity = 0.0
+    model.step(0.5)
+    assert model.solved_components == 0
+
+    generator.rate_capacity = -1.0
+    model.step(0.5)
+    assert (model.solved_components, model.skipped_components) == (1, 1)
+    assert generator.rate == approx(-1.0)
+    assert tank.qty == approx(4.5)
+
+    # A different dt solves everything
+    model.step(0.25)
+    assert model.solved_components == 2
+
+
+def test_link_capacity_limits_flow():
+    model = FlowModel()
+    source = model.add_port("source", FlowPort(10.0, 0.0))
+    sink = model.add_port("sink", FlowPort(-8.0, 0.0))
+    model.link_ports(source, sink, capacity=3.0)
+
+    model.step(0.1)
+    assert source.rate == approx(3.0)
+    assert sink.rate == approx(-3.0)
+
+    # A second route adds its capacity
+    junction = model.add_port("junction", FlowPort(0.0, 0.0))
+    model.link_ports(source, junction, capacity=2.0)
+    model.link_ports(junction, sink)
+
+    model.step(0.1)
+    assert source.rate == approx(5.0)
+    assert sink.rate == approx(-5.0)
+
+    model.set_link_capacity(source, sink, inf)
+    model.step(0.1)
+    assert sink.rate == approx(-8.0)
+
+
+def test_link_capacity_reroutes_to_spare_sources():
+    # The solve asks each source for half the demand, but the first one's
+    # link only carries 1, so the second makes up the difference
+    model = FlowModel()
+    limited = model.add_port("limited", FlowPort(10.0, 0.0))
+    free = model.add_port("free", FlowPort(10.0, 0.0))
+    sink = model.add_port("sink", FlowPort(-5.0, 0.0))
+    model.link_ports(limited, sink, capacity=1.0)
+    model.link_ports(free, sink)
+
+    model.step(0.1)
+    assert sink.rate == approx(-5.0)
+    assert limited.rate == approx(1.0)
+    assert free.rate == approx(4.0)
+
+    # Beyond what the sources can give, the sink is cut back
+    sink.rate_capacity = -20.0
+    model.step(0.1)
+    assert sink.rate == approx(-11.0)
+    assert free.rate == approx(10.0)
+
+
+def test_link_capacity_limits_storage():
+    model = FlowModel()
+    source = model.add_port("source", FlowPort(1.0, 0.0))
+    tank = model.add_port("tank", FlowPort(0.0, 5.0))
+    model.link_ports(source, tank, capacity=0.25)
+
+    model.step(1.0)
+    assert source.rate == approx(0.25)
+    assert tank.rate == approx(-0.25)
+    assert tank.qty == approx(0.25)
+
+
+def test_link_flows_are_warm_started():
+    model = FlowModel()
+    sources = [model.add_port(f"s{i}", FlowPort(1.0, 0.0)) for i in range(5)]
+    tank = model.add_port("tank", FlowPort(0.0, 100.0))
+    for source in sources:
+        model.link_ports(source, tank, capacity=0.5)
+
+    model.step(1.0)
+    assert tank.qty == approx(2.5)
+    assert model.augmenting_paths == 5
+
+    # Same inputs, so last tick's flows are still a maximum
+    model.step(1.0)
+    assert tank.qty == approx(5.0)
+    assert model.augmenting_paths == 5
+
+    # Only the changed link needs a new path
+    model.set_link_capacity(sources[0], tank, 0.75)
+    model.step(1.0)
+    assert tank.qty == approx(7.75)
+    assert model.augmenting_paths == 6
+
+
+def test_models_can_share_a_store():
+    store = FlowStore()
+    models = []
+    tanks = []
+    for i in range(3):
+        model = FlowModel()
+        source = model.add_port("source", FlowPort(1.0, 0.0))
+        tanks.append(model.add_port("tank", FlowPort(0.0, 5.0, qty=1.0)))
+        model.link_ports(source, "tank", capacity=0.5 * (i + 1))
+        model.step(1.0)
+
+        model.bind(store)
+        models.append(model)
+
+    assert all(tank.store is store for tank in tanks)
+    assert [tank.qty for tank in tanks] == approx([1.5, 2.0, 2.0])
+
+    store.solve(1.0)
+    for model in models:
+        model.limit()
+
+    assert store.solved_components == 3
+    assert [tank.qty for tank in tanks] == approx([2.0, 3.0, 3.0])
+
+    # Moving a model out releases its slots for reuse
+    models[0].bind(FlowStore())
+    assert len(store.free_slots) == 2
+    models[0].add_port("extra", FlowPort(0.0, 0.0))
+    store.solve(1.0)
+    assert store.solved_components == 2
+    assert tanks[0].qty == approx(2.0)
+
+
+def test_region_steps_ships_together():
+    region = Region("region")
+    ships = []
+    for i in range(2):
+        ship = Ship(f"ship{i}")
+        ship.add_child(FuelTank("tank", 10.0, 5.0))
+        ship.add_child(AuxGenerator("generator", 100.0))
+        ship.link_ports("tank:fuel", "generator:fuel")
+        region.add_child(ship)
+        ships.append(ship)
+
+    assert all(ship.flow_model.store is region.flow_store for ship in ships)
+
+    ships[0].flow_model.graph.nodes["generator:fuel"]["port"].rate_capacity = -1.0
+    for ship in ships:
+        ship.physics_process(0.5)
+    region.physics_process(0.5)
+
+    tank0, tank1 = (ship.devices[0].flow_ports["fuel"] for ship in ships)
+    assert tank0.qty == approx(4.5)
+    assert tank1.qty == approx(5.0)
+
+
+def test_watchers_are_told_about_port_changes():
+    model = FlowModel()
+    source = model.add_port("source", FlowPort(1.0, 0.0))
+    tank = model.add_port("tank", FlowPort(0.0, 1.0))
+    model.link_ports(source, tank)
+    model.step(0.5)
+
+    updates = []
+    source.watch(lambda: updates.append("source"))
+    model.step(0.5)
+    assert updates == []
+
+    # The tank is full, so the source rate drops
+    model.step(0.5)
+    assert updates == ["source"]
+
+    source.unwatch(source.watchers[0])
+    source.rate_capacity = 2.0
+    model.step(0.5)
+    assert updates == ["source"]
+    assert model.store.watched == {}
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from pytest import approx
+
+from brijsim.pydot import MainLoop, Node, SceneTree
+
+
+class Counter(Node):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.steps = 0
+
+    def process(self, delta: float):
+        self.steps += 1
+
+
+def build_loop(**kwargs) -> tuple[MainLoop, Counter]:
+    tree = SceneTree()
+    counter = Counter("counter")
+    tree.add_child(counter)
+    return MainLoop(tree, **kwargs), counter
+
+
+def test_advance_accumulates_real_time():
+    loop, counter = build_loop(dt=0.1)
+
+    assert loop.advance(0.05) == 0
+    assert loop.advance(0.06) == 1
+    assert loop.stats.lag == approx(0.01)
+    assert loop.interpolation_fraction == approx(0.1)
+
+    assert loop.advance(0.29) == 3
+    assert counter.steps == 4
+    assert loop.stats.lag == approx(0.0, abs=1e-9)
+    assert loop.stats.ticks == 2
+
+
+def test_advance_caps_catch_up_steps():
+    loop, counter = build_loop(dt=0.1, max_substeps=3)
+
+    assert loop.advance(1.05) == 3
+    assert loop.stats.skipped_steps == 7
+    assert loop.stats.lag == approx(0.05)
+
+    assert loop.advance(0.05) == 1
+    assert counter.steps == 4
+
+
+class FakeTime:
+    # A clock that only moves when the loop sleeps, stopping the loop after
+    # a number of sleeps
+    def __init__(self, sleeps: int):
+        self.now = 0.0
+        self.sleeps = sleeps
+        self.loop: MainLoop | None = None
+
+    def clock(self) -> float:
+        return self.now
+
+    async def sleep(self, duration: float):
+        self.now += duration
+        self.sleeps -= 1
+        if self.sleeps < 0:
+            self.loop.stop()
+        await asyncio.sleep(0)
+
+
+def test_run_on_event_loop():
+    fake = FakeTime(sleeps=10)
+    loop, counter = build_loop(dt=0.01, clock=fake.clock, sleep=fake.sleep)
+    fake.loop = loop
+
+    async def run():
+        with pytest.raises(asyncio.CancelledError):
+            await loop.start()
+
+    asyncio.run(run())
+    assert counter.steps == 10
+    assert loop.stats.steps == 10
+    assert loop.stats.skipped_steps == 0
+
+
+class SlowCounter(Counter):
+    # Moves a fake clock on by a set duration for each step
+    def __init__(self, name: str, fake: FakeTime, durations: list[float]):
+        super().__init__(name)
+        self.fake = fake
+        self.durations = durations
+
+    def process(self, delta: float):
+        self.fake.now += self.durations[self.steps]
+        super().process(delta)
+
+
+def test_overruns_are_counted_per_step():
+    fake = FakeTime(sleeps=0)
+    tree = SceneTree()
+    counter = SlowCounter("counter", fake, [0.05, 0.05, 0.05, 0.15])
+    tree.add_child(counter)
+    loop = MainLoop(tree, dt=0.1, clock=fake.clock, sleep=fake.sleep)
+
+    # Catching up three steps takes longer than dt, but no single step does
+    assert loop.advance(0.3) == 3
+    assert loop.stats.tick_duration == approx(0.15)
+    assert loop.stats.overruns == 0
+
+    assert loop.advance(0.1) == 1
+    assert loop.stats.overruns == 1
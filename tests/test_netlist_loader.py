@@ -0,0 +1,134 @@
+import pytest
+from pytest import approx
+
+from brijsim.netlist_loader import NetlistLoader, parse_value, parse_values
+
+
+def test_parse_value():
+    assert parse_value("10") == 10
+    assert parse_value("-2.5e3") == -2500
+    assert parse_value("4.7k") == approx(4_700)
+    assert parse_value("10meg") == approx(10e6)
+    assert parse_value("10MEG") == approx(10e6)
+    assert parse_value("100uF") == approx(100e-6)
+    assert parse_value("3m") == approx(3e-3)
+
+    with pytest.raises(ValueError):
+        parse_value("ohms")
+
+    with pytest.raises(ValueError):
+        parse_value("10kfoo")
+
+    with pytest.raises(ValueError):
+        parse_value("1_000")
+
+
+def test_parse_values():
+    tokens = ["10", "-2.5e3", "4.7k", "10MEG", "100uF", "3m", "1f", "2mf", "5ohm"]
+    expected = [parse_value(token) for token in tokens]
+    assert parse_values(tokens).tolist() == approx(expected)
+
+    for bad in ("10kfoo", "1_000", "ohms", "1e"):
+        with pytest.raises(ValueError):
+            parse_values(["1k", bad])
+
+
+def test_load_lines():
+    # https://lpsa.swarthmore.edu/Systems/Electrical/mna/MNA3.html, Case 1
+    sim = NetlistLoader().load_lines(
+        [
+            "* Case 1",
+            "V1 2 1 32",
+            "V2 3 gnd DC 20",
+            "",
+            "R1 1 0 2",
+            "R2 2 3 4",
+            "R3 2 0 8",
+            ".op",
+            ".end",
+            "R4 2 0 8",
+        ]
+    )
+
+    assert set(sim.resistors) == {"R1", "R2", "R3"}
+    assert len(sim.nodes) == 4
+
+    sim.run()
+
+    assert sim.nodes[1].voltage == approx(-8)
+    assert sim.nodes[2].voltage == approx(24)
+    assert sim.nodes[3].voltage == approx(20)
+    assert sim.ind_voltage_sources[0].current == approx(-4)
+    assert sim.ind_voltage_sources[1].current == approx(1)
+
+
+def test_load_file(tmp_path):
+    netlist = tmp_path / "rc.cir"
+    netlist.write_text("V1 1 0 10\nR1 1 2 1k\nC1 2 0 1m\nL1 2 3 1u\nI1 3 0 1m\n")
+
+    sim = NetlistLoader().load(netlist)
+
+    assert sim.resistors["R1"].resistance == approx(1_000)
+    assert sim.capacitors["C1"].capacitance == approx(1e-3)
+    assert sim.inductors["L1"].inductance == approx(1e-6)
+    assert sim.ind_current_sources[0].current == approx(1e-3)
+
+
+def test_load_errors_report_line():
+    with pytest.raises(ValueError, match="Line 2"):
+        NetlistLoader().load_lines(["R1 1 0 10", "Q1 1 2 3 model"])
+
+    with pytest.raises(ValueError, match="Line 1"):
+        NetlistLoader().load_lines(["R1 1 10"])
+
+    with pytest.raises(ValueError, match="Line 1"):
+        NetlistLoader().load_lines(["R1 a 0 10"])
+
+    with pytest.raises(ValueError, match="Line 3"):
+        NetlistLoader().load_lines(["R1 1 0 10", "R2 1 2 1k", "R3 2 0 10kfoo"])
+
+    with pytest.raises(ValueError, match="Line 2"):
+        NetlistLoader().load_lines(["R1 1 0 10", "R2 1 -2 1k"])
+
+    with pytest.raises(ValueError, match="Line 2"):
+        NetlistLoader().load_lines(["R1 1 0 10", "R2 1 2 1_000"])
+
+    with pytest.raises(ValueError, match="Line 1: Unexpected '5' after C1"):
+        NetlistLoader().load_lines(["C1 1 0 1u 5"])
+
+    with pytest.raises(ValueError, match="Line 1: Expected a value for L1"):
+        NetlistLoader().load_lines(["L1 1 0"])
+
+    with pytest.raises(ValueError, match="Line 1: Expected a value after DC"):
+        NetlistLoader().load_lines(["V1 1 0 DC"])
+
+
+def test_load_ac_sources():
+    sim = NetlistLoader().load_lines(
+        ["V1 1 0 DC 5 AC 1 90", "V2 2 0 AC 2", "I1 2 1 1m AC 3m -45", "R1 1 2 1"]
+    )
+
+    v1, v2 = sim.ind_voltage_sources
+    assert (v1.voltage, v1.ac_magnitude, v1.ac_phase) == (5, 1, 90)
+    assert (v2.voltage, v2.ac_magnitude, v2.ac_phase) == (0, 2, 0)
+
+    i1 = sim.ind_current_sources[0]
+    assert i1.current == approx(1e-3)
+    assert i1.ac_magnitude == approx(3e-3)
+    assert i1.ac_phase == -45
+
+
+def test_load_large_netlist():
+    # A ladder of 100k resistors and capacitors
+    size = 100_000
+    lines = ["V1 1 0 DC 5"] + [
+        f"R{i} {i + 1} {i + 2} 4.7k" if i % 3 else f"C{i} {i + 1} 0 10u"
+        for i in range(size)
+    ]
+
+    sim = NetlistLoader().load_lines(lines)
+
+    assert len(sim.nodes) == size + 1
+    assert len(sim.resistors) + len(sim.capacitors) == size
+    assert sim.resistors["R1"].resistance == approx(4_700)
+    assert [link.component.name for link in sim.nodes[3].links] == ["R1", "R2"]
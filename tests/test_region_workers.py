@@ -0,0 +1,103 @@
+import pytest
+from pytest import approx
+
+from brijsim.pydot import Body3D, SceneTree, Vector3
+from brijsim.ship.ship_loader import ShipLoader
+from brijsim.universe.region import Region
+from brijsim.universe.region_workers import RegionWorkers
+from brijsim.universe.universe import Universe
+
+
+class Courier(Body3D):
+    # Hands itself off to the next region once it has travelled far enough
+    def __init__(self, name: str, destination: str):
+        super().__init__(name, mass=1.0)
+        self.destination = destination
+
+    def process(self, delta: float):
+        if self.position.x >= 1.0 and self.destination:
+            destination, self.destination = self.destination, ""
+            self.parent.hand_off(self, destination)
+
+
+def build_regions() -> tuple[Region, Region, Courier]:
+    region1 = Region("Region 1")
+    region2 = Region("Region 2")
+    courier = Courier("courier", "Region 2")
+    courier.velocity = Vector3(10, 0, 0)
+    region1.add_child(courier)
+    return region1, region2, courier
+
+
+def test_universe_hands_off_between_regions():
+    tree = SceneTree()
+    universe = Universe("universe")
+    region1, region2, courier = build_regions()
+    tree.add_child(universe)
+    universe.add_region(region1)
+    universe.add_region(region2)
+
+    tree.process(0.1)
+    assert courier.parent is region1
+
+    tree.process(0.1)
+    assert courier.parent is None
+    assert region1.departures == []
+
+    tree.process(0.1)
+    assert courier.parent is region2
+    assert courier.rigid_bodies is region2.rigid_bodies
+    assert courier.position.x == approx(2.0)
+
+
+def test_universe_rejects_unknown_destination():
+    tree = SceneTree()
+    universe = Universe("universe")
+    region = Region("Region 1")
+    courier = Courier("courier", "Nowhere")
+    courier.velocity = Vector3(10, 0, 0)
+    region.add_child(courier)
+    tree.add_child(universe)
+    universe.add_region(region)
+
+    tree.process(0.1)
+    with pytest.raises(ValueError, match="unknown region 'Nowhere'"):
+        tree.process(0.1)
+
+
+def test_workers_check_regions():
+    region1, region2, _ = build_regions()
+    tree = SceneTree()
+    tree.add_child(region1)
+    with pytest.raises(ValueError, match="detached"):
+        RegionWorkers([[region1], [region2]])
+
+    region2.bodies_near.connect(lambda a, b: None)
+    with pytest.raises(TypeError, match="Region 2"):
+        RegionWorkers([[region2]])
+
+
+def test_workers_step_regions_and_hand_off():
+    region1, region2, _ = build_regions()
+    ship = ShipLoader().load("assets/ships/demo_ship.yaml")
+    region2.add_child(ship)
+
+    workers = RegionWorkers([[region1], [region2]], physics_dt=0.05)
+    workers.start()
+    try:
+        for _ in range(4):
+            workers.process(0.1)
+
+        bodies = workers.states["Region 2"]["bodies"]
+        assert [body["name"] for body in bodies] == ["Demo Ship", "courier"]
+        assert workers.states["Region 1"]["bodies"] == []
+        assert len(workers.device_details) == len(ship.devices) + sum(
+            len(room.devices) for room in ship.rooms
+        )
+    finally:
+        region1, region2 = workers.stop()
+
+    courier = region2.children[-1]
+    assert courier.name == "courier"
+    assert courier.position.x == approx(3.0)
+    assert courier.velocity == Vector3(10, 0, 0)
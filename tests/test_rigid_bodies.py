@@ -0,0 +1,172 @@
+from math import pi
+
+import numpy as np
+from pytest import approx
+
+from brijsim.pydot import Body3D, BoxShape3D, BroadPhase, Vector3
+from brijsim.ship.room import Room
+from brijsim.ship.ship import Ship
+from brijsim.universe.region import Region
+
+
+def build_ship(name: str, mass: float = 1000.0) -> Ship:
+    ship = Ship(name)
+    ship.add_child(Room("hold", Vector3(0, 5, 0), mass, BoxShape3D(Vector3(4, 4, 3))))
+    return ship
+
+
+def test_ship_mass_is_its_rooms():
+    ship = build_ship("ship", 1500.0)
+    assert ship.mass == 1500.0
+
+    ship.remove_child(ship.rooms[0])
+    assert ship.mass == 0.0
+
+
+def test_region_integrates_forces_and_velocities():
+    region = Region("region")
+    pushed = build_ship("pushed", 1000.0)
+    drifting = build_ship("drifting")
+    drifting.velocity = Vector3(0, 0, 2)
+    region.add_child(pushed)
+    region.add_child(drifting)
+    assert pushed.rigid_bodies is region.rigid_bodies
+
+    # Forces are cleared after each step, so this only pushes once
+    pushed.apply_force(Vector3(1000, 0, 0))
+    for _ in range(10):
+        region.physics_process(0.1)
+
+    assert pushed.velocity == Vector3(0.1, 0, 0)
+    assert pushed.position.x == approx(0.1)
+    assert drifting.position.z == approx(2.0)
+    assert list(drifting.rooms[0].global_position_array) == approx([0, 5, 2])
+
+
+def test_spin_rotates_children():
+    region = Region("region")
+    ship = build_ship("ship")
+    region.add_child(ship)
+
+    ship.angular_velocity = Vector3(0, 0, pi / 2)
+    for _ in range(100):
+        region.physics_process(0.01)
+
+    # A quarter turn about z takes the room's offset (0, 5) to (-5, 0)
+    position = ship.rooms[0].global_position_array
+    assert list(position) == approx([-5, 0, 0], abs=1e-3)
+    assert np.linalg.norm(ship.quaternion) == approx(1.0)
+
+
+def test_motion_is_kept_when_leaving_a_region():
+    region = Region("region")
+    ship = build_ship("ship")
+    region.add_child(ship)
+    ship.velocity = Vector3(1, 0, 0)
+
+    region.remove_child(ship)
+    assert ship.rigid_bodies is not region.rigid_bodies
+    assert ship.velocity == Vector3(1, 0, 0)
+    assert ship.mass == 1000.0
+
+    ship.physics_process(0.5)
+    assert ship.position.x == approx(0.5)
+
+
+def test_region_reports_near_and_colliding_ships():
+    region = Region("region")
+    ships = [build_ship(f"ship{i}") for i in range(3)]
+    ships[1].position = Vector3(100, 0, 0)
+    ships[2].position = Vector3(1000, 0, 0)
+    for ship in ships:
+        region.add_child(ship)
+
+    events = []
+    region.bodies_near.connect(lambda a, b: events.append(("near", {a, b})))
+    region.bodies_apart.connect(lambda a, b: events.append(("apart", {a, b})))
+    region.bodies_collided.connect(lambda a, b: events.append(("hit", {a, b})))
+
+    region.physics_process(0.1)
+    assert events == []
+
+    # The hold spans 4 m in x, so 54 m apart leaves a 50 m gap
+    ships[1].position = Vector3(54, 0, 0)
+    region.physics_process(0.1)
+    assert events == [("near", {ships[0], ships[1]})]
+
+    ships[1].velocity = Vector3(-100, 0, 0)
+    region.physics_process(0.5)
+    assert events[1:] == [("hit", {ships[0], ships[1]})]
+    assert region.broad_phase.overlapping_pairs in (
+        [(ships[0], ships[1])],
+        [(ships[1], ships[0])],
+    )
+
+    region.remove_child(ships[0])
+    region.physics_process(0.1)
+    assert events[2:] == [("apart", {ships[0], ships[1]})]
+
+
+def test_broad_phase_follows_rooms():
+    ship = build_ship("ship")
+    buoy = Body3D("buoy", Vector3(0, 2, 0), shape=BoxShape3D(Vector3(1, 1, 1)))
+    broad_phase = BroadPhase()
+    broad_phase.insert(ship)
+    broad_phase.insert(buoy)
+
+    # The hold spans y 3 to 7, and the ship has no shape of its own, so its
+    # box doesn't reach down to its origin and the buoy
+    broad_phase.update()
+    assert broad_phase.overlapping_pairs == []
+
+    # Moving, adding and removing rooms after the ship went in all count
+    ship.rooms[0].position = Vector3(0, 1, 0)
+    _, _, touching, _ = broad_phase.update()
+    assert [set(pair) for pair in touching] == [{ship, buoy}]
+
+    ship.remove_child(ship.rooms[0])
+    _, _, _, separated = broad_phase.update()
+    assert [set(pair) for pair in separated] == [{ship, buoy}]
+
+    bay = Room("bay", Vector3(0, 3, 0), 10.0, BoxShape3D(Vector3(2, 2, 2)))
+    ship.add_child(bay)
+    _, _, touching, _ = broad_phase.update()
+    assert [set(pair) for pair in touching] == [{ship, buoy}]
+
+    bay.position = Vector3(0, 10, 0)
+    _, _, _, separated = broad_phase.update()
+    assert [set(pair) for pair in separated] == [{ship, buoy}]
+
+
+def test_broad_phase_matches_brute_force():
+    rng = np.random.default_rng(1)
+    region = Region("region")
+    ships = [build_ship(f"ship{i}") for i in range(200)]
+    for ship in ships:
+        ship.position = Vector3(*rng.uniform(0, 1000, 3).tolist())
+        ship.angular_velocity = Vector3(*rng.uniform(-1, 1, 3).tolist())
+        region.add_child(ship)
+
+    for _ in range(3):
+        region.physics_process(0.1)
+        lower, upper = [], []
+        for ship in ships:
+            corners = [
+                room.global_position_array + np.array([x, y, z])
+                for room in ship.rooms
+                for x in (-2, 2)
+                for y in (-2, 2)
+                for z in (-1.5, 1.5)
+            ]
+            # A ship has no shape of its own, so its box is just its rooms'
+            lower.append(np.min(corners, axis=0))
+            upper.append(np.max(corners, axis=0))
+
+        expected = {
+            frozenset((ships[i], ships[j]))
+            for i in range(len(ships))
+            for j in range(i)
+            if np.all(lower[i] <= upper[j] + 50) and np.all(lower[j] <= upper[i] + 50)
+        }
+        found = {frozenset(pair) for pair in region.broad_phase.near_pairs}
+        assert found >= expected
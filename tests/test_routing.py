@@ -0,0 +1,93 @@
+import networkx as nx
+import numpy as np
+from pytest import approx
+
+from brijsim.universe.region import Region
+from brijsim.universe.universe import Universe, Wormhole
+
+
+def build_universe(num_regions: int) -> tuple[Universe, list[Region]]:
+    universe = Universe("universe")
+    regions = [Region(f"R{i}") for i in range(num_regions)]
+    for region in regions:
+        universe.add_region(region)
+    return universe, regions
+
+
+def test_routes_and_jumps():
+    universe, (r0, r1, r2, _) = build_universe(4)
+    universe.add_wormhole(Wormhole("a"), r0, r1)
+    universe.add_wormhole(Wormhole("b"), r1, r2)
+    direct = Wormhole("direct")
+    universe.add_wormhole(direct, r0, r2, length=5.0)
+
+    assert universe.route("R0", "R2") == ["R0", "R1", "R2"]
+    assert universe.route("R0", "R3") is None
+    assert universe.route("R2", "R0") is None
+    assert [jump.name for jump in universe.plan_jumps("R0", "R2")] == ["a", "b"]
+    assert direct.entrance.parent is r0
+    assert direct.exit.parent is r2
+
+    # A second, shorter wormhole over the same hop is taken instead
+    shortcut = Wormhole("shortcut")
+    universe.add_wormhole(shortcut, r0, r2, length=0.5)
+    assert universe.plan_jumps("R0", "R2") == [shortcut]
+
+    universe.remove_wormhole(shortcut)
+    assert universe.route("R0", "R2") == ["R0", "R1", "R2"]
+    assert shortcut.entrance.parent is None
+
+
+def test_only_affected_routes_are_recomputed():
+    universe, (r0, r1, r2, r3) = build_universe(4)
+    universe.add_wormhole(Wormhole("a"), r0, r1)
+    b = Wormhole("b")
+    universe.add_wormhole(b, r1, r2)
+    universe.add_wormhole(Wormhole("c"), r3, r0)
+    universe.routes.precompute()
+    searches = universe.routes.searches
+
+    # R3 is already closer to itself than any way through R2, so only its
+    # routes are kept, and the others are searched again when next asked for
+    universe.add_wormhole(Wormhole("back"), r2, r3, length=10.0)
+    assert set(universe.routes.paths) == {"R3"}
+    assert universe.routes.searches == searches
+    assert universe.route("R2", "R1") == ["R2", "R3", "R0", "R1"]
+    assert universe.routes.searches == searches + 1
+
+    # Every tree but R2's own reaches R2 through b
+    universe.routes.precompute()
+    searches = universe.routes.searches
+    universe.remove_wormhole(b)
+    assert set(universe.routes.paths) == {"R2"}
+    assert universe.route("R2", "R3") == ["R2", "R3"]
+    assert universe.routes.searches == searches
+
+
+def test_cached_routes_match_fresh_searches():
+    rng = np.random.default_rng(3)
+    universe, regions = build_universe(30)
+    wormholes: list[Wormhole] = []
+
+    for step in range(200):
+        if wormholes and rng.random() < 0.4:
+            universe.remove_wormhole(wormholes.pop(rng.integers(len(wormholes))))
+        else:
+            source, destination = rng.choice(len(regions), 2, replace=False)
+            wormhole = Wormhole(f"w{step}")
+            universe.add_wormhole(
+                wormhole,
+                regions[source],
+                regions[destination],
+                float(rng.uniform(1, 10)),
+            )
+            wormholes.append(wormhole)
+
+        for source, destination in rng.integers(len(regions), size=(10, 2)):
+            u, v = f"R{source}", f"R{destination}"
+            expected = nx.has_path(universe.network, u, v)
+            assert (universe.route(u, v) is not None) == expected
+            if expected:
+                assert universe.routes.distance(u, v) == approx(
+                    nx.shortest_path_length(universe.network, u, v, weight="weight")
+                )
@@ -0,0 +1,236 @@
+from typing import ClassVar
+
+from pytest import approx
+
+from brijsim.devices.computer import JumpComputer
+from brijsim.devices.device import Device
+from brijsim.devices.generator import FusionGenerator, FusionGeneratorState
+from brijsim.devices.tanks import FuelTank
+from brijsim.flow_sim import FlowPort, FlowStore
+from brijsim.pydot import Node, Node3D, SceneTree
+from brijsim.ship.room import Room
+from brijsim.ship.ship import Ship
+from brijsim.universe.region import Region
+
+
+def build_tree() -> tuple[SceneTree, Region, Ship]:
+    tree = SceneTree()
+    region = Region("region")
+    tree.add_child(region)
+
+    ship = Ship("ship")
+    room = Room("room")
+    ship.add_child(room)
+    room.add_child(FuelTank("tank", 10.0))
+    ship.add_child(FuelTank("reserve", 5.0))
+    region.add_child(ship)
+    return tree, region, ship
+
+
+def test_find_nodes_by_type_uses_index():
+    tree, _, ship = build_tree()
+
+    devices = tree.find_nodes_by_type(Device)
+    assert {device.name for device in devices} == {"tank", "reserve"}
+    assert tree.find_nodes_by_type(Ship) == {ship}
+    assert len(tree.find_nodes_by_type(Node3D)) == 5
+    assert tree.root in tree.find_nodes_by_type(Node)
+
+    # Subtree queries still work
+    assert tree.find_nodes_by_type(Device, ship.rooms[0]) == {ship.rooms[0].devices[0]}
+
+
+def test_node_added_and_removed_signals():
+    tree, region, ship = build_tree()
+    added = []
+    removed = []
+    tree.node_added.connect(added.append)
+    tree.node_removed.connect(removed.append)
+
+    tank = FuelTank("spare", 1.0)
+    ship.add_child(tank)
+    assert added == [tank]
+    assert tree.node_uuid_map[tank.uuid] is tank
+
+    region.remove_child(ship)
+    # The ship, its room, the room's tank, the reserve and the spare
+    assert len(removed) == 5
+    assert removed[-1] is ship
+    assert tree.find_nodes_by_type(Device) == set()
+    assert tank.uuid not in tree.node_uuid_map
+    assert ship.scene_tree is None
+
+    tree.node_added.disconnect(added.append)
+    region.add_child(ship)
+    assert added == [tank]
+    assert len(tree.find_nodes_by_type(Device)) == 3
+
+
+def test_removing_nodes_releases_flow_ports():
+    _, region, ship = build_tree()
+    assert ship.flow_model.store is region.flow_store
+
+    region.remove_child(ship)
+    assert ship.flow_model.store is not region.flow_store
+    assert region.flow_models == []
+
+    reserve = ship.devices[0]
+    ship.remove_child(reserve)
+    assert "reserve:fuel" not in ship.flow_model.graph
+    assert isinstance(reserve.flow_ports["fuel"].store, FlowStore)
+    assert reserve.flow_ports["fuel"].qty_capacity == 5.0
+
+
+def test_removing_a_room_releases_its_devices_flow_ports():
+    _, _, ship = build_tree()
+    room = ship.rooms[0]
+    tank = room.devices[0]
+    assert "tank:fuel" in ship.flow_model.graph
+
+    ship.remove_child(room)
+    assert "tank:fuel" not in ship.flow_model.graph
+    assert isinstance(tank.flow_ports["fuel"].store, FlowStore)
+    assert "reserve:fuel" in ship.flow_model.graph
+
+    # Putting the room back brings its tank back with it
+    ship.add_child(room)
+    assert "tank:fuel" in ship.flow_model.graph
+    ship.remove_child(room)
+    assert "tank:fuel" not in ship.flow_model.graph
+
+
+class Recorder(Node):
+    calls: ClassVar[list[str]] = []
+
+    def process(self, delta: float):
+        self.calls.append(self.name)
+
+
+def test_process_schedule_is_post_order_and_skips_inert_nodes():
+    tree = SceneTree()
+    Recorder.calls = []
+    a = Recorder("a")
+    b = Node("b")
+    a.add_child(b)
+    b.add_child(Recorder("c"))
+    b.add_child(Recorder("d"))
+    tree.add_child(a)
+
+    tree.process(0.1)
+    assert Recorder.calls == ["c", "d", "a"]
+    assert len(tree.schedule) == 3
+
+    b.add_child(Recorder("e"))
+    tree.process(0.1)
+    assert Recorder.calls[3:] == ["c", "d", "e", "a"]
+
+    a.remove_child(b)
+    tree.process(0.1)
+    assert Recorder.calls[7:] == ["a"]
+
+
+class Counter(Node):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.deltas: list[float] = []
+
+    def process(self, delta: float):
+        self.deltas.append(delta)
+
+
+def test_process_intervals_and_sleeping():
+    tree = SceneTree()
+    fast = Counter("fast")
+    slow = Counter("slow")
+    slow.process_interval = 0.3
+    tree.add_child(fast)
+    tree.add_child(slow)
+
+    for _ in range(6):
+        tree.process(0.1)
+
+    assert fast.deltas == approx([0.1] * 6)
+    assert slow.deltas == approx([0.3, 0.3])
+
+    fast.sleep()
+    tree.process(0.1)
+    assert len(fast.deltas) == 6
+    assert tree.running == [slow]
+
+    fast.wake()
+    tree.process(0.1)
+    assert len(fast.deltas) == 7
+
+
+def test_devices_wake_on_actions_and_port_changes():
+    tree, _, ship = build_tree()
+    generator = FusionGenerator("generator")
+    computer = JumpComputer("computer")
+    ship.add_child(generator)
+    ship.add_child(computer)
+    ship.link_ports("generator:src", "computer:pwr")
+
+    # Newly added ports count as changed, so it takes a second tick to settle
+    tree.process(0.1)
+    tree.process(0.1)
+    assert generator.sleeping and computer.sleeping
+
+    tree.process(0.1)
+    assert tree.running == []
+
+    generator.start()
+    assert not generator.sleeping
+    tree.process(0.1)
+    assert generator.state == FusionGeneratorState.STARTING
+
+    # Feed the boost port so it reaches capacity, which wakes the generator
+    ship.flow_model.add_port("booster", FlowPort(50.0, 0.0))
+    ship.link_ports("booster", "generator:boost")
+    tree.process(0.1)
+    tree.process(0.1)
+    assert generator.state == FusionGeneratorState.RUNNING
+
+    # The generator's new source capacity powers the computer, waking it
+    tree.process(0.1)
+    assert computer.state == "True"
+
+
+class Physics(Node):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.deltas: list[float] = []
+
+    def physics_process(self, delta: float):
+        self.deltas.append(delta)
+
+
+def test_physics_substeps_at_fixed_dt():
+    tree = SceneTree(physics_dt=0.02)
+    logic = Counter("logic")
+    physics = Physics("physics")
+    tree.add_child(logic)
+    tree.add_child(physics)
+
+    tree.process(0.1)
+    assert logic.deltas == [0.1]
+    assert physics.deltas == approx([0.02] * 5)
+    assert tree.schedule == [logic]
+
+    # Leftover time carries over
+    tree.process(0.05)
+    assert len(physics.deltas) == 7
+    assert tree.physics_fraction == approx(0.5)
+
+    tree.process(0.01)
+    assert len(physics.deltas) == 8
+    assert tree.physics_fraction == approx(0.0, abs=1e-6)
+
+
+def test_physics_runs_once_per_tick_by_default():
+    tree = SceneTree()
+    physics = Physics("physics")
+    tree.add_child(physics)
+
+    tree.process(0.1)
+    tree.process(0.25)
+    assert physics.deltas == [0.1, 0.25]
@@ -0,0 +1,27 @@
+from brijsim.devices.generator import FusionGeneratorState, SimpleGeneratorState
+from brijsim.pydot import SceneTree
+from brijsim.server import PHYSICS_DT, TICK_DT
+from brijsim.ship.ship_loader import ShipLoader
+from brijsim.universe.region import Region
+
+
+def test_demo_ship_powers_up_at_server_rates():
+    tree = SceneTree(physics_dt=PHYSICS_DT)
+    region = Region("region")
+    tree.add_child(region)
+    ship = ShipLoader().load("assets/ships/demo_ship.yaml")
+    region.add_child(ship)
+
+    devices = {device.name: device for room in ship.rooms for device in room.devices}
+    aux, fusion = devices["AuxGen1"], devices["FusGen1"]
+    tank, computer = devices["Tank1"], devices["JumpCom1"]
+    aux.start()
+    fusion.start()
+
+    for _ in range(round(5.0 / TICK_DT)):
+        tree.process(TICK_DT)
+
+    assert aux.state == SimpleGeneratorState.RUNNING
+    assert fusion.state == FusionGeneratorState.RUNNING
+    assert computer.state == "True"
+    assert tank.flow_ports["fuel"].qty > 0
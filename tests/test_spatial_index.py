@@ -0,0 +1,110 @@
+from brijsim.devices.tanks import FuelTank
+from brijsim.pydot import Body3D, BoxShape3D, SpatialGrid, Vector3
+from brijsim.ship.room import Room
+from brijsim.ship.ship import Ship
+from brijsim.universe.region import Region
+
+
+def build_ship() -> tuple[Ship, Room, Room, FuelTank]:
+    ship = Ship("ship")
+    bridge = Room("bridge", Vector3(0, 0, 0), shape=BoxShape3D(Vector3(4, 4, 3)))
+    engine = Room("engine", Vector3(10, 0, 0), shape=BoxShape3D(Vector3(6, 4, 3)))
+    ship.add_child(bridge)
+    ship.add_child(engine)
+    tank = FuelTank("tank", 5.0)
+    tank.position = Vector3(1, 0, 0)
+    engine.add_child(tank)
+    return ship, bridge, engine, tank
+
+
+def test_point_box_and_radius_queries():
+    ship, bridge, engine, tank = build_ship()
+    index = ship.spatial_index
+    assert len(index) == 3
+
+    assert ship.rooms_at(Vector3(1, 1, 1)) == [bridge]
+    assert ship.rooms_at(Vector3(5, 0, 0)) == []
+    assert index.query_point(Vector3(11, 0, 0)) == [engine, tank]
+
+    assert set(index.query_box(Vector3(-1, -1, -1), Vector3(8, 1, 1))) == {
+        bridge,
+        engine,
+    }
+    assert index.query_box(Vector3(20, 0, 0), Vector3(30, 5, 5)) == []
+
+    # The bridge's nearest face is 3 from here, the engine room's is 2
+    assert index.query_radius(Vector3(5, 0, 0), 2.5, Room) == [engine]
+    assert len(index.query_radius(Vector3(5, 0, 0), 3.0, Room)) == 2
+
+
+def test_index_follows_moves_and_removals():
+    ship, _, engine, tank = build_ship()
+    index = ship.spatial_index
+    assert index.query_point(Vector3(11, 0, 0)) == [engine, tank]
+
+    engine.position = Vector3(100, 0, 0)
+    assert index.query_point(Vector3(11, 0, 0)) == []
+    assert index.query_point(Vector3(101, 0, 0)) == [engine, tank]
+
+    engine.remove_child(tank)
+    assert index.query_point(Vector3(101, 0, 0)) == [engine]
+
+    ship.remove_child(engine)
+    assert len(index) == 1
+    assert index.query_radius(Vector3(100, 0, 0), 10) == []
+
+
+def test_region_index_covers_all_ships():
+    region = Region("region")
+    ship1, bridge1, _, _ = build_ship()
+    ship2, bridge2, _, _ = build_ship()
+    ship2.position = Vector3(0, 500, 0)
+    region.add_child(ship1)
+    region.add_child(ship2)
+
+    index = region.spatial_index
+    assert len(index) == 6
+    assert index.query_point(Vector3(0, 500, 0)) == [bridge2]
+
+    ship2.position = Vector3(0, 0, 0)
+    assert set(index.query_point(Vector3(0, 0, 0))) == {bridge1, bridge2}
+
+    region.remove_child(ship1)
+    assert len(index) == 3
+    assert index.query_point(Vector3(0, 0, 0)) == [bridge2]
+
+
+def test_grid_with_many_bodies():
+    index = SpatialGrid(cell_size=2.0)
+    bodies = []
+    for i in range(50):
+        for j in range(50):
+            shape = BoxShape3D(Vector3(1, 1, 1))
+            body = Body3D(f"{i},{j}", Vector3(i, j, 0), shape=shape)
+            index.insert(body)
+            bodies.append(body)
+
+    assert len(index.query_radius(Vector3(25, 25, 0), 0.5)) == 5
+    assert len(index.query_box(Vector3(0, 0, 0), Vector3(9.4, 9.4, 0))) == 100
+
+    bodies[0].position = Vector3(25, 25, 0)
+    assert bodies[0] in index.query_point(Vector3(25, 25, 0))
+    assert index.query_point(Vector3(0, 0, 0)) == []
+
+
+def test_grid_only_regroups_when_its_stores_release_slots():
+    index = SpatialGrid()
+    body = Body3D("body", Vector3(1, 0, 0), shape=BoxShape3D(Vector3(1, 1, 1)))
+    index.insert(body)
+    assert index.query_point(Vector3(1, 0, 0)) == [body]
+    groups = index.groups
+
+    # Nodes moving between stores the grid doesn't use leave it alone
+    Body3D("a").add_child(Body3D("b"))
+    index.query_point(Vector3(1, 0, 0))
+    assert index.groups is groups
+
+    # One of its bodies moving to another store regroups it
+    Body3D("holder", Vector3(50, 0, 0)).add_child(body)
+    assert index.query_point(Vector3(51, 0, 0)) == [body]
+    assert index.query_point(Vector3(1, 0, 0)) == []
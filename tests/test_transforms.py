@@ -0,0 +1,83 @@
+from math import cos, pi, sin
+
+import numpy as np
+from pytest import approx
+
+from brijsim.pydot import Node, Node3D, Vector3
+
+
+def build_hierarchy() -> tuple[Node3D, Node3D, Node3D]:
+    region = Node3D("region")
+    ship = Node3D("ship")
+    room = Node3D("room")
+    ship.position = Vector3(10, 0, 0)
+    room.position = Vector3(1, 2, 3)
+    ship.add_child(room)
+    region.add_child(ship)
+    return region, ship, room
+
+
+def test_world_positions_follow_parents():
+    region, ship, room = build_hierarchy()
+
+    assert room.transforms is region.transforms
+    assert room.global_position == Vector3(11, 2, 3)
+
+    region.position = Vector3(0, 0, 100)
+    assert room.global_position == Vector3(11, 2, 103)
+    assert ship.global_position == Vector3(10, 0, 100)
+    assert room.position == Vector3(1, 2, 3)
+
+
+def test_world_positions_follow_parent_rotation():
+    _, ship, room = build_hierarchy()
+
+    # A quarter turn about z takes the room's offset (1, 2) to (-2, 1)
+    ship.quaternion = np.array([cos(pi / 4), 0.0, 0.0, sin(pi / 4)])
+    assert list(room.global_position_array) == approx([8, 1, 3])
+
+    room.global_position = Vector3(10, 5, 0)
+    assert room.global_position_array.tolist() == approx([10, 5, 0])
+    assert [room.position.x, room.position.y] == approx([5, 0], abs=1e-12)
+
+
+def test_global_position_is_a_copy():
+    _, ship, room = build_hierarchy()
+
+    position = room.global_position
+    position.x += 1
+    assert room.global_position == Vector3(11, 2, 3)
+
+    ship.position = Vector3(0, 0, 0)
+    assert room.global_position == Vector3(1, 2, 3)
+
+
+def test_rotation_turns_children():
+    _, ship, room = build_hierarchy()
+    ship.position = Vector3(0, 0, 0)
+
+    # A quarter turn about z takes the room's offset (1, 2) to (-2, 1)
+    ship.rotation = Vector3(0, 0, pi / 2)
+    assert list(room.global_position_array) == approx([-2, 1, 3])
+    assert ship.rotation.z == approx(pi / 2)
+
+    rotation = Vector3(0.3, -0.5, 1.2)
+    ship.rotation = rotation
+    assert [ship.rotation.x, ship.rotation.y, ship.rotation.z] == approx(
+        [0.3, -0.5, 1.2]
+    )
+
+
+def test_removed_subtree_keeps_local_position():
+    region, ship, room = build_hierarchy()
+    region.position = Vector3(0, 50, 0)
+
+    region.remove_child(ship)
+    assert ship.transforms is not region.transforms
+    assert room.transforms is ship.transforms
+    assert room.global_position == Vector3(11, 2, 3)
+
+    # Plain nodes break the Node3D chain, as before
+    holder = Node("holder")
+    holder.add_child(ship)
+    assert ship.global_position == Vector3(10, 0, 0)